@@ -0,0 +1,553 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright Université Rennes 1 / INSERM
+# Contributor: Raphael Weber
+#
+# Under CeCILL license
+# http://www.cecill.info
+
+"""
+Script for benchmarking the generators of tools_doc_sphinx on synthetic
+packages and directory trees of configurable size:
+
+- API reference generation (:func:`.auto_doc_api.generate_index_files`),
+- methods groups parsing (:func:`.summary_groups.launch_group_parser`) and
+  group lookup for each method (:func:`.summary_groups.example_grouper`),
+- tree view generation (:func:`.tree_view_source_code.write_tree_view`).
+
+Each entry point is timed and its peak memory allocation is measured with
+:mod:`tracemalloc`. The results may be written in a JSON file, so that
+releases can be compared.
+"""
+
+from os import mkdir, makedirs
+from os.path import dirname, abspath
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from argparse import ArgumentParser
+from types import SimpleNamespace
+from functools import partial
+import tracemalloc
+import platform
+import sys
+import json
+
+# make the package importable from the source directory
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from tools_doc_sphinx import __version__
+from tools_doc_sphinx import auto_doc_api, summary_groups
+from tools_doc_sphinx import tree_view_source_code, module_tree
+
+
+#: (*str*) Source code of the ``__init__.py`` file of the synthetic packages
+INIT_CODE = '''"""
+Synthetic package
+"""
+
+from os.path import dirname
+from pkgutil import iter_modules
+
+__path__ = [dirname(__file__)]
+
+__all__ = []
+for _, module_name, _ in iter_modules(__path__):
+    __all__.append(module_name)
+'''
+
+#: (*str*) Decoration line of the methods groups
+GROUP_DECO = "    # %s #\n" % ('*' * 71)
+
+
+def write_synthetic_module(
+    module_path, nb_class, nb_method, nb_group, nb_data, nb_function
+):
+    """
+    Writes the source code of a synthetic module
+
+    :param module_path: path to the source code file
+    :type module_path: str
+    :param nb_class: number of classes in the module
+    :type nb_class: int
+    :param nb_method: number of methods per class
+    :type nb_method: int
+    :param nb_group: number of methods groups per class, the methods are
+        evenly distributed in the groups
+    :type nb_group: int
+    :param nb_data: number of global variables in the module
+    :type nb_data: int
+    :param nb_function: number of functions in the module
+    :type nb_function: int
+    """
+
+    line_list = ['"""\nSynthetic module\n"""\n\nfrom os.path import join\n\n']
+
+    for i in range(nb_data):
+        line_list.append("DATA_%d = %d\n" % (i, i))
+
+    for i in range(nb_class):
+        line_list.append(
+            "\n\nclass Class%d():\n    \"\"\"Class %d\"\"\"\n\n" % (i, i)
+        )
+
+        # get number of methods per group
+        if nb_group > 0:
+            nb_method_group = max(1, nb_method // nb_group)
+        else:
+            nb_method_group = nb_method + 1
+
+        for j in range(nb_method):
+            # start group
+            if nb_group > 0 and j % nb_method_group == 0 \
+                    and j // nb_method_group < nb_group:
+                line_list += [
+                    GROUP_DECO,
+                    "    # Group: Group %d\n" % (j // nb_method_group),
+                    GROUP_DECO, "\n"
+                ]
+
+            line_list.append(
+                "    def method_%d(self, arg):\n"
+                "        \"\"\"Method %d\"\"\"\n\n"
+                "        return arg\n\n" % (j, j)
+            )
+
+            # end group
+            if nb_group > 0 and (
+                j % nb_method_group == nb_method_group - 1
+                or j == nb_method - 1
+            ) and j // nb_method_group < nb_group:
+                line_list += [
+                    GROUP_DECO, "    # End group\n", GROUP_DECO, "\n"
+                ]
+
+    for i in range(nb_function):
+        line_list.append(
+            "\n\ndef function_%d(arg):\n    \"\"\"Function %d\"\"\"\n\n"
+            "    return join(arg, arg)\n" % (i, i)
+        )
+
+    with open(module_path, 'w') as f:
+        f.writelines(line_list)
+
+
+def make_synthetic_package(
+    root_dir, package_name, nb_subpackage=4, nb_module=10, nb_class=3,
+    nb_method=20, nb_group=4, nb_data=5, nb_function=10
+):
+    """
+    Creates a synthetic package with a single level of sub-packages
+
+    :param root_dir: directory where to create the package
+    :type root_dir: str
+    :param package_name: name of the package
+    :type package_name: str
+    :param nb_subpackage: number of sub-packages
+    :type nb_subpackage: int
+    :param nb_module: number of modules per sub-package
+    :type nb_module: int
+    :param nb_class: see :func:`.write_synthetic_module`
+    :type nb_class: int
+    :param nb_method: see :func:`.write_synthetic_module`
+    :type nb_method: int
+    :param nb_group: see :func:`.write_synthetic_module`
+    :type nb_group: int
+    :param nb_data: see :func:`.write_synthetic_module`
+    :type nb_data: int
+    :param nb_function: see :func:`.write_synthetic_module`
+    :type nb_function: int
+
+    :returns: list of tuples (class name, method name) defined in the package
+    :rtype: list
+    """
+
+    package_dir = "%s/%s" % (root_dir, package_name)
+    mkdir(package_dir)
+    with open("%s/__init__.py" % package_dir, 'w') as f:
+        f.write(INIT_CODE)
+
+    for i in range(nb_subpackage):
+        subpackage_dir = "%s/sub_%d" % (package_dir, i)
+        mkdir(subpackage_dir)
+        with open("%s/__init__.py" % subpackage_dir, 'w') as f:
+            f.write(INIT_CODE)
+
+        for j in range(nb_module):
+            write_synthetic_module(
+                "%s/module_%d.py" % (subpackage_dir, j), nb_class, nb_method,
+                nb_group, nb_data, nb_function
+            )
+
+    return [
+        ("Class%d" % i, "method_%d" % j)
+        for i in range(nb_class) for j in range(nb_method)
+    ]
+
+
+def make_synthetic_tree(
+    root_dir, depth=3, nb_dir=5, nb_file=20, ignore_list=["*.pyc", "build/"]
+):
+    """
+    Creates a synthetic directory tree with a gitignore file at its root
+
+    Each directory contains ``nb_dir`` sub-directories (up to ``depth``
+    levels), one of them named ``build``, and ``nb_file`` files, half of them
+    with the extension ``.pyc``.
+
+    :param root_dir: root directory of the tree
+    :type root_dir: str
+    :param depth: number of levels of directories
+    :type depth: int
+    :param nb_dir: number of sub-directories per directory
+    :type nb_dir: int
+    :param nb_file: number of files per directory
+    :type nb_file: int
+    :param ignore_list: patterns written in the gitignore file
+    :type ignore_list: list
+
+    :returns: number of items (files and directories) in the tree
+    :rtype: int
+    """
+
+    nb_item = 0
+    dir_list = [root_dir]
+    for level in range(depth + 1):
+        sub_dir_list = []
+        for dir_path in dir_list:
+            makedirs(dir_path, exist_ok=True)
+            for i in range(nb_file):
+                extension = ".pyc" if i % 2 else ".py"
+                open("%s/file_%d%s" % (dir_path, i, extension), 'w').close()
+
+            nb_item += nb_file
+
+            if level < depth:
+                sub_dir_list += ["%s/build" % dir_path] + [
+                    "%s/dir_%d" % (dir_path, i) for i in range(nb_dir - 1)
+                ]
+
+        nb_item += len(sub_dir_list)
+        dir_list = sub_dir_list
+
+    with open("%s/.gitignore" % root_dir, 'w') as f:
+        f.write('\n'.join(ignore_list) + '\n')
+
+    return nb_item
+
+
+def measure(function, *args, reset_function=None, **kwargs):
+    """
+    Times a function call and measures its peak memory allocation
+
+    The function is called twice: the first call is timed without tracing
+    the memory (:mod:`tracemalloc` slows down the code a lot), the second
+    one is traced to get the peak memory allocation.
+
+    :param function: function to call
+    :param args: positional arguments of the function
+    :param reset_function: function called without argument before each
+        call, so that both calls start from the same state (e.g.
+        :func:`.clear_caches`), ``None`` for no reset
+    :type reset_function: function
+    :param kwargs: keyword arguments of the function
+
+    :returns: dictionary with keys ``"time"`` (seconds) and ``"peak_memory"``
+        (bytes allocated by Python, see :mod:`tracemalloc`)
+    :rtype: dict
+    """
+
+    # time call without tracing the memory
+    if reset_function is not None:
+        reset_function()
+
+    start = perf_counter()
+    function(*args, **kwargs)
+    duration = perf_counter() - start
+
+    # measure peak memory allocation of another call
+    if reset_function is not None:
+        reset_function()
+
+    tracemalloc.start()
+    function(*args, **kwargs)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"time": duration, "peak_memory": peak_memory}
+
+
+def unload_package(package_name):
+    """
+    Removes a package and its sub-packages/modules from :data:`sys.modules`,
+    so that they are imported again
+
+    :param package_name: name of the package
+    :type package_name: str
+    """
+
+    for module_name in list(sys.modules.keys()):
+        if module_name == package_name \
+                or module_name.startswith(package_name + '.'):
+            del sys.modules[module_name]
+
+
+def clear_caches(package_name=None):
+    """
+    Clears the caches kept in memory by the tools (trees of packages and
+    parsed methods groups), so that each measure starts from a cold state
+
+    :param package_name: name of a package also removed from
+        :data:`sys.modules` (see :func:`.unload_package`), ``None`` for none
+    :type package_name: str
+    """
+
+    if package_name is not None:
+        unload_package(package_name)
+
+    summary_groups.clear_group_cache()
+    module_tree.clear_module_tree_cache()
+
+
+def bench_auto_doc_api(work_dir, package_name, backend="import", jobs=1):
+    """
+    Benchmarks the API reference generation of a synthetic package
+
+    :param work_dir: directory containing the synthetic package
+    :type work_dir: str
+    :param package_name: name of the synthetic package
+    :type package_name: str
+    :param backend: see :func:`.auto_doc_api.generate_index_files`
+    :type backend: str
+    :param jobs: see :func:`.auto_doc_api.generate_index_files`
+    :type jobs: int
+
+    :returns: see output of :func:`.measure`
+    :rtype: dict
+    """
+
+    # create documentation source directory
+    doc_dir = "%s/doc_%s_%d" % (work_dir, backend, jobs)
+    mkdir(doc_dir)
+    with open("%s/index.rst" % doc_dir, 'w') as f:
+        f.write("Doc\n===\n\n.. toctree::\n\n   intro\n")
+
+    return measure(
+        auto_doc_api.generate_index_files, package_name, doc_dir,
+        package_dir=work_dir, backend=backend, jobs=jobs,
+        reset_function=partial(clear_caches, package_name)
+    )
+
+
+def run_grouper(package_name, method_list):
+    """
+    Calls :func:`.summary_groups.example_grouper` for each method, as
+    autodocsumm does during a Sphinx build, after building the index of
+    methods groups as at the beginning of the build (with a minimal
+    replacement of the Sphinx application)
+
+    :param package_name: name of the package
+    :type package_name: str
+    :param method_list: list of tuples (class name, method name)
+    :type method_list: list
+    """
+
+    app = SimpleNamespace(
+        config=SimpleNamespace(summary_groups_packages=[package_name]),
+        env=SimpleNamespace()
+    )
+    summary_groups.clear_group_index(app)
+    summary_groups.set_group_packages(app)
+
+    class_dict = {}
+    for class_name, method_name in method_list:
+        if class_name not in class_dict:
+            class_dict[class_name] = type(class_name, (), {})
+
+        summary_groups.example_grouper(
+            app, "method", method_name, None, None, class_dict[class_name]
+        )
+
+
+def bench_summary_groups(work_dir, package_name, method_list):
+    """
+    Benchmarks the methods groups parsing of a synthetic package
+
+    :param work_dir: directory containing the synthetic package
+    :type work_dir: str
+    :param package_name: name of the synthetic package
+    :type package_name: str
+    :param method_list: list of tuples (class name, method name) for which
+        the group is looked up
+    :type method_list: list
+
+    :returns: dictionary with keys ``"launch_group_parser"`` and
+        ``"example_grouper"``, values are the output of :func:`.measure`
+    :rtype: dict
+    """
+
+    if work_dir not in sys.path:
+        sys.path.insert(0, work_dir)
+
+    parser_result = measure(
+        summary_groups.launch_group_parser, package_name,
+        reset_function=clear_caches
+    )
+    grouper_result = measure(
+        run_grouper, package_name, method_list, reset_function=clear_caches
+    )
+
+    return {
+        "launch_group_parser": parser_result,
+        "example_grouper": grouper_result
+    }
+
+
+def bench_tree_view(work_dir):
+    """
+    Benchmarks the tree view generation of a synthetic directory tree
+
+    :param work_dir: root directory of the synthetic tree
+    :type work_dir: str
+
+    :returns: see output of :func:`.measure`
+    :rtype: dict
+    """
+
+    gitignore_path = "%s/.gitignore" % work_dir
+    ignore_rule_list = [(work_dir, tree_view_source_code.compile_ignore_list(
+        tree_view_source_code.load_gitignore(gitignore_path)
+    ))]
+
+    return measure(
+        tree_view_source_code.write_tree_view, work_dir,
+        "%s.txt" % work_dir, file_option='w', dir_root_name='',
+        ignore_rule_list=ignore_rule_list
+    )
+
+
+if __name__ == "__main__":
+    #############
+    # arguments #
+    #############
+    parser = ArgumentParser()
+
+    parser.add_argument(
+        "--nb_subpackage", type=int, default=4,
+        help="number of sub-packages in the synthetic package, default 4"
+    )
+
+    parser.add_argument(
+        "--nb_module", type=int, default=10,
+        help="number of modules per sub-package, default 10"
+    )
+
+    parser.add_argument(
+        "--nb_class", type=int, default=3,
+        help="number of classes per module, default 3"
+    )
+
+    parser.add_argument(
+        "--nb_method", type=int, default=20,
+        help="number of methods per class, default 20"
+    )
+
+    parser.add_argument(
+        "--nb_group", type=int, default=4,
+        help="number of methods groups per class, default 4"
+    )
+
+    parser.add_argument(
+        "--tree_depth", type=int, default=3,
+        help="number of levels of the synthetic directory tree, default 3"
+    )
+
+    parser.add_argument(
+        "--tree_nb_dir", type=int, default=5,
+        help="number of sub-directories per directory, default 5"
+    )
+
+    parser.add_argument(
+        "--tree_nb_file", type=int, default=20,
+        help="number of files per directory, default 20"
+    )
+
+    parser.add_argument(
+        "--ignore_list", nargs='+', type=str, default=["*.pyc", "build/"],
+        help="patterns of the gitignore file of the synthetic tree, default "
+        "'*.pyc' 'build/'"
+    )
+
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="number of processes for the parallel API reference generation "
+        "(also benchmarked if greater than 1), default 1"
+    )
+
+    parser.add_argument(
+        "--output_path", "-o", type=str, default=None,
+        help="path to the JSON file where to write the results, default None"
+    )
+
+    args, _ = parser.parse_known_args()
+
+    ######################
+    # script starts here #
+    ######################
+
+    result_dict = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": vars(args),
+        "results": {}
+    }
+
+    with TemporaryDirectory() as work_dir:
+        # create synthetic package
+        package_name = "synthetic_pkg"
+        method_list = make_synthetic_package(
+            work_dir, package_name, nb_subpackage=args.nb_subpackage,
+            nb_module=args.nb_module, nb_class=args.nb_class,
+            nb_method=args.nb_method, nb_group=args.nb_group
+        )
+
+        # benchmark API reference generation
+        result_dict["results"]["auto_doc_api_import"] = bench_auto_doc_api(
+            work_dir, package_name, backend="import"
+        )
+
+        result_dict["results"]["auto_doc_api_ast"] = bench_auto_doc_api(
+            work_dir, package_name, backend="ast"
+        )
+
+        if args.jobs > 1:
+            result_dict["results"]["auto_doc_api_jobs"] = bench_auto_doc_api(
+                work_dir, package_name, backend="import", jobs=args.jobs
+            )
+
+        # benchmark methods groups
+        result_dict["results"].update(
+            bench_summary_groups(work_dir, package_name, method_list)
+        )
+
+        # create synthetic tree
+        tree_dir = "%s/tree" % work_dir
+        result_dict["parameters"]["tree_nb_item"] = make_synthetic_tree(
+            tree_dir, depth=args.tree_depth, nb_dir=args.tree_nb_dir,
+            nb_file=args.tree_nb_file, ignore_list=args.ignore_list
+        )
+
+        # benchmark tree view
+        result_dict["results"]["tree_view"] = bench_tree_view(tree_dir)
+
+    # print results
+    for name, result in result_dict["results"].items():
+        print(
+            "%s: %.3f s, peak memory %.1f kB" % (
+                name, result["time"], result["peak_memory"] / 1024
+            )
+        )
+
+    if args.output_path is not None:
+        with open(args.output_path, 'w') as f:
+            json.dump(result_dict, f, indent=1)
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright Université Rennes 1 / INSERM
+# Contributor: Raphael Weber
+#
+# Under CeCILL license
+# http://www.cecill.info
+
+"""
+Script for measuring the import time of the modules of tools_doc_sphinx, each
+import is timed in a new interpreter so that the measure includes the loading
+of all dependencies
+
+It also checks that the modules only import the standard library, since they
+are loaded as Sphinx extensions in every documentation build.
+"""
+
+from os import environ, pathsep
+from os.path import dirname, abspath
+from statistics import median
+from subprocess import run, PIPE
+from argparse import ArgumentParser
+import sys
+import json
+
+
+#: (*str*) Directory containing the package tools_doc_sphinx
+REPO_DIR = dirname(dirname(abspath(__file__)))
+
+#: (*str*) Code run in a new interpreter for timing an import, it prints a
+#: JSON dictionary with the import time, the peak memory and the modules that
+#: are not part of the standard library
+IMPORT_CODE = """
+import sys
+import json
+from time import perf_counter
+
+module_set = set(sys.modules.keys())
+start = perf_counter()
+import %s
+duration = perf_counter() - start
+
+try:
+    from resource import getrusage, RUSAGE_SELF
+    max_rss = getrusage(RUSAGE_SELF).ru_maxrss
+except ImportError:
+    max_rss = None
+
+stdlib_set = getattr(sys, "stdlib_module_names", None)
+if stdlib_set is None:
+    non_stdlib_list = None
+else:
+    non_stdlib_list = sorted(set(
+        name.split('.')[0] for name in set(sys.modules.keys()) - module_set
+        if name.split('.')[0] not in stdlib_set
+        and name.split('.')[0] != "tools_doc_sphinx"
+        and not name.startswith("__")
+    ))
+
+print(json.dumps({
+    "duration": duration, "max_rss": max_rss,
+    "non_stdlib_list": non_stdlib_list
+}))
+"""
+
+
+def time_import(module_name, nb_run=10):
+    """
+    Measures the import time of a module, in new interpreters
+
+    :param module_name: full name of the module to import
+    :type module_name: str
+    :param nb_run: number of runs (one interpreter per run)
+    :type nb_run: int
+
+    :returns: dictionary with the following keys:
+
+        - ``"module"``: name of the module,
+        - ``"min"``, ``"median"``: minimum and median import time in seconds,
+        - ``"max_rss"``: peak resident memory of the interpreter (kilobytes on
+          Linux), ``None`` if not available,
+        - ``"non_stdlib_list"``: top-level modules imported that are not part
+          of the standard library, ``None`` if it cannot be checked (Python
+          older than 3.10).
+    :rtype: dict
+    """
+
+    # make the package importable from the source directory
+    env = dict(environ)
+    python_path_list = env.get("PYTHONPATH", "").split(pathsep)
+    env["PYTHONPATH"] = pathsep.join(
+        [REPO_DIR] + [p for p in python_path_list if p != '']
+    )
+
+    # initialize list of results
+    result_list = []
+
+    # loop on runs
+    for _ in range(nb_run):
+        process = run(
+            [sys.executable, "-c", IMPORT_CODE % module_name], stdout=PIPE,
+            env=env, check=True, universal_newlines=True
+        )
+        result_list.append(json.loads(process.stdout))
+
+    duration_list = [result["duration"] for result in result_list]
+
+    return {
+        "module": module_name,
+        "min": min(duration_list),
+        "median": median(duration_list),
+        "max_rss": result_list[-1]["max_rss"],
+        "non_stdlib_list": result_list[-1]["non_stdlib_list"]
+    }
+
+
+if __name__ == "__main__":
+    #############
+    # arguments #
+    #############
+    parser = ArgumentParser()
+
+    parser.add_argument(
+        "module_list",
+        nargs='*',
+        type=str,
+        help="modules to import, default tools_doc_sphinx "
+        "tools_doc_sphinx.summary_groups",
+        default=["tools_doc_sphinx", "tools_doc_sphinx.summary_groups"]
+    )
+
+    parser.add_argument(
+        "--nb_run",
+        "-n",
+        type=int,
+        help="number of imports per module, default 10",
+        default=10
+    )
+
+    parser.add_argument(
+        "--max_time",
+        "-m",
+        type=float,
+        help="maximum median import time in seconds, the script fails if it "
+        "is exceeded, default None",
+        default=None
+    )
+
+    parser.add_argument(
+        "--output_path",
+        "-o",
+        type=str,
+        help="path to the JSON file where to write the results, default None",
+        default=None
+    )
+
+    args, _ = parser.parse_known_args()
+
+    ######################
+    # script starts here #
+    ######################
+
+    # initialize list of errors
+    error_list = []
+
+    # loop on modules
+    result_list = []
+    for module_name in args.module_list:
+        result = time_import(module_name, nb_run=args.nb_run)
+        result_list.append(result)
+
+        print(
+            "%s: min %.1f ms, median %.1f ms, max RSS %s kB" % (
+                module_name, 1000 * result["min"], 1000 * result["median"],
+                result["max_rss"]
+            )
+        )
+
+        # check dependencies
+        if result["non_stdlib_list"]:
+            error_list.append(
+                "%s imports modules outside the standard library: %s" % (
+                    module_name, ", ".join(result["non_stdlib_list"])
+                )
+            )
+
+        # check import time
+        if args.max_time is not None and result["median"] > args.max_time:
+            error_list.append(
+                "%s median import time %.1f ms exceeds %.1f ms" % (
+                    module_name, 1000 * result["median"], 1000 * args.max_time
+                )
+            )
+
+    if args.output_path is not None:
+        with open(args.output_path, 'w') as f:
+            json.dump(result_list, f, indent=1)
+
+    if len(error_list) > 0:
+        sys.exit('\n'.join(error_list))
@@ -4,18 +4,71 @@ tools_doc_sphinx
 
 Package with tools for automatic generation of files used in Sphinx
 documentation
+
+Sub-modules are loaded lazily, on first access to an attribute of the
+package, and ``__all__`` is computed on first access, so that importing the
+package does not list its directory.
 """
 
 __version__ = "0.1.1"
 __authors__ = "Raphaël Weber"
 
 
-from os.path import dirname
-from pkgutil import iter_modules
+from os.path import dirname as _dirname
+from importlib import import_module as _import_module
+from sys import version_info as _version_info
 
-pkg_dir = dirname(__file__)
+pkg_dir = _dirname(__file__)
 __path__ = [pkg_dir]
 
-__all__ = []
-for _, module_name, _ in iter_modules(__path__):
-	__all__.append(module_name)
+
+def _get_module_names():
+	"""
+	Gets the names of the sub-modules of the package
+
+	:rtype: list
+	"""
+
+	from pkgutil import iter_modules
+
+	return [module_name for _, module_name, _ in iter_modules(__path__)]
+
+
+def __getattr__(name):
+	"""
+	Loads a sub-module of the package (or computes ``__all__``) on first
+	access, see https://peps.python.org/pep-0562/
+	"""
+
+	if name == "__all__":
+		globals()["__all__"] = _get_module_names()
+		return globals()["__all__"]
+
+	if not name.startswith('_'):
+		try:
+			return _import_module("%s.%s" % (__name__, name))
+
+		except ModuleNotFoundError as error:
+			if error.name != "%s.%s" % (__name__, name):
+				raise
+
+	raise AttributeError(
+		"module '%s' has no attribute '%s'" % (__name__, name)
+	)
+
+
+def __dir__():
+	"""
+	Lists the attributes of the package, including the sub-modules that are
+	not loaded yet (private helpers are not listed)
+	"""
+
+	return sorted(set(
+		name for name in globals().keys()
+		if not name.startswith('_') or name.startswith('__')
+	) | set(__getattr__("__all__")))
+
+
+# module attributes __getattr__ and __dir__ are not supported before Python 3.7
+if _version_info < (3, 7):
+	__all__ = _get_module_names()
@@ -9,23 +9,755 @@
 """
 Script for automatic generation of API reference indexes (RST files), it must
 be launched before generating Sphinx documentation
+
+It may also be used as a Sphinx extension (see :func:`.setup`), so that the
+API reference is generated in the Sphinx process at the beginning of each
+build.
 """
 
 from inspect import getmembers, isclass, isfunction, ismodule
 from importlib import import_module
-from sys import path, setrecursionlimit
-from os import mkdir
-from os.path import isdir, abspath
-from shutil import rmtree
+from types import ModuleType
+from contextlib import contextmanager
+from collections import deque
+from functools import partial
+from hashlib import sha1
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import SimpleQueue
+from weakref import WeakKeyDictionary
+from time import time, perf_counter
+import sqlite3
+import signal
+import ast
+import json
+from sys import path, version, version_info
+from os import mkdir, makedirs, getpid, kill, stat, scandir, remove, rmdir, \
+    sep
+from os.path import isdir, isfile, abspath, relpath
 from argparse import ArgumentParser
+from tools_doc_sphinx.module_tree import find_module_spec, get_module_tree, \
+    get_module_node, get_module_index, MODULE_INDEX_NAME
+
+
+#: (*str*) Name of the file where the source hashes of the documented modules
+#: are stored for incremental generation, inside the output directory
+MANIFEST_NAME = ".auto_doc_api_manifest.json"
+
+#: (*str*) Name of the empty file used as source file of the pages of the API
+#: reference kept in memory by the Sphinx extension, inside the doctree
+#: directory, see :func:`.register_virtual_pages`
+VIRTUAL_PAGE_NAME = "auto_doc_api_virtual_page.rst"
+
+#: (*tuple*) Versions of Sphinx supporting the pages in memory (first version
+#: included, last version excluded), they rely on the private mapping
+#: ``Project._docname_to_path`` of Sphinx, added in Sphinx 7.2 and tested up
+#: to Sphinx 9.0, see :func:`.register_virtual_pages`
+VIRTUAL_PAGE_SPHINX_RANGE = ((7, 2), (10, 0))
+
+#: (*list*) Standard global variables of a module that are not documented
+STANDARD_GLOBAL_LIST = [
+    "__annotations__", "__builtins__", "__cached__", "__doc__", "__file__",
+    "__name__", "__package__"
+]
+
+#: (*list*) Built-in types whose instances are documented as data by the
+#: backend ``"ast"`` when a global variable is assigned a call to them (as
+#: with the backend ``"import"``, since they have no attribute
+#: ``__module__``), see :func:`.get_assigned_member_type`
+BUILTIN_DATA_TYPE_LIST = [
+    "bool", "bytearray", "bytes", "complex", "dict", "float", "frozenset",
+    "int", "list", "object", "range", "set", "slice", "str", "tuple"
+]
+
+#: (*list*) Functions creating a class in the calling module, a global
+#: variable assigned a call to them is documented as a class by the backend
+#: ``"ast"``, see :func:`.get_assigned_member_type`
+CLASS_FACTORY_LIST = [
+    "namedtuple", "NamedTuple", "TypedDict", "Enum", "IntEnum", "Flag",
+    "IntFlag", "StrEnum", "type"
+]
+
+#: (*float*) Delay in seconds added to the timeout of the import of a module
+#: before the worker processes are considered stuck and terminated, see
+#: :class:`.ImportSandbox`
+SANDBOX_GRACE_TIME = 10
+
+#: (*WeakKeyDictionary*) Members of the modules already classified, key is
+#: the module object, value is the output of
+#: :func:`.classify_module_members`
+_module_member_cache = WeakKeyDictionary()
+
+#: (:class:`.GenerationProfiler`) Profiler of the generation, see
+#: :func:`.set_profiler` (``None`` when profiling is disabled)
+_profiler = None
+
+
+class GenerationProfiler():
+    """
+    Records the duration of the steps of the generation of RST index files
+    for each module (``"import"``, ``"classify"`` for getting the members,
+    ``"render"`` for building the RST content, ``"write"`` for writing the
+    RST files, the manifest, the cache of members and the index of modules),
+    along with the number of file opens and of written bytes (for the SQLite
+    cache of members, the bytes of the stored entries, without the overhead
+    of the database)
+
+    It is enabled with :func:`.set_profiler` (or the argument ``profiler`` of
+    :func:`.generate_index_files`). When no profiler is set, the generation
+    only checks that the global profiler is ``None``.
+
+    Functions may be registered with :meth:`.add_hook`, they are called with
+    each recorded event.
+    """
+
+    def __init__(self):
+        #: (*float*) Time of creation of the profiler, see
+        #: :func:`time.perf_counter`
+        self.start_time = perf_counter()
+
+        #: (*list*) Recorded events, each element is a dictionary with keys
+        #: ``"category"``, ``"name"`` (module full name or file path),
+        #: ``"start"`` (see :func:`time.perf_counter`), ``"duration"``
+        #: (seconds) and ``"pid"`` (process identifier)
+        self.event_list = []
+
+        #: (*int*) Number of file opens
+        self.nb_file_open = 0
+
+        #: (*int*) Number of bytes written in files
+        self.nb_byte_written = 0
+
+        #: (*list*) Functions called with each recorded event
+        self.hook_list = []
+
+    def add_hook(self, hook):
+        """
+        Registers a function called with each recorded event
+
+        :param hook: function with one positional argument, the event (see
+            attribute :attr:`.event_list`)
+        """
+
+        self.hook_list.append(hook)
+
+    def add_event(self, category, name, start):
+        """
+        Records an event that ends now
+
+        :param category: step of the generation
+        :type category: str
+        :param name: module full name or file path
+        :type name: str
+        :param start: start time of the event, see :func:`time.perf_counter`
+        :type start: float
+        """
+
+        self.merge_events([{
+            "category": category, "name": name, "start": start,
+            "duration": perf_counter() - start, "pid": getpid()
+        }])
+
+    def merge_events(self, event_list):
+        """
+        Records events, e.g. recorded by the profiler of a worker process
+
+        :param event_list: events, see attribute :attr:`.event_list`
+        :type event_list: list
+        """
+
+        for event in event_list:
+            self.event_list.append(event)
+            for hook in self.hook_list:
+                hook(event)
+
+    def count_file_open(self, nb_byte_written=0):
+        """
+        Counts a file open
+
+        :param nb_byte_written: number of bytes written in the file
+        :type nb_byte_written: int
+        """
+
+        self.nb_file_open += 1
+        self.nb_byte_written += nb_byte_written
+
+    def count_byte_written(self, nb_byte_written):
+        """
+        Counts bytes written in a file already counted as opened, see
+        :meth:`.count_file_open`
+
+        :param nb_byte_written: number of bytes written in the file
+        :type nb_byte_written: int
+        """
+
+        self.nb_byte_written += nb_byte_written
+
+    def get_summary(self):
+        """
+        Gets the total duration of each step of the generation
+
+        :returns: key is the category of the events, value is a dictionary
+            with keys ``"count"`` and ``"duration"`` (total in seconds)
+        :rtype: dict
+        """
+
+        summary_dict = {}
+        for event in self.event_list:
+            category_dict = summary_dict.setdefault(
+                event["category"], {"count": 0, "duration": 0.}
+            )
+            category_dict["count"] += 1
+            category_dict["duration"] += event["duration"]
+
+        return summary_dict
+
+    def print_summary(self, nb_module=10):
+        """
+        Prints the summary table of the profiling and the slowest modules
+
+        :param nb_module: number of slowest modules to print
+        :type nb_module: int
+        """
+
+        print("%-12s %8s %12s" % ("step", "count", "time (s)"))
+        for category, category_dict in self.get_summary().items():
+            print("%-12s %8d %12.3f" % (
+                category, category_dict["count"], category_dict["duration"]
+            ))
+
+        print("file opens: %d, bytes written: %d" % (
+            self.nb_file_open, self.nb_byte_written
+        ))
+
+        # get total duration of each module (except whole generation)
+        module_dict = {}
+        for event in self.event_list:
+            if event["category"] in ("import", "classify", "render"):
+                module_dict[event["name"]] = module_dict.get(
+                    event["name"], 0.
+                ) + event["duration"]
+
+        if len(module_dict) > 0:
+            print("slowest modules:")
+            for name in sorted(
+                module_dict, key=module_dict.get, reverse=True
+            )[:nb_module]:
+                print("    %8.3f s  %s" % (module_dict[name], name))
+
+    def write_trace(self, trace_path):
+        """
+        Writes the recorded events in a JSON file with the Chrome trace event
+        format (may be opened with ``chrome://tracing`` or Perfetto), the
+        summary is stored in the key ``"otherData"``
+
+        :param trace_path: path to the JSON file
+        :type trace_path: str
+        """
+
+        trace_event_list = [{
+            "name": event["name"], "cat": event["category"], "ph": 'X',
+            "ts": 1e6 * (event["start"] - self.start_time),
+            "dur": 1e6 * event["duration"], "pid": event["pid"], "tid": 0
+        } for event in self.event_list]
+
+        with open(trace_path, 'w') as f:
+            json.dump({
+                "traceEvents": trace_event_list,
+                "otherData": {
+                    "summary": self.get_summary(),
+                    "nb_file_open": self.nb_file_open,
+                    "nb_byte_written": self.nb_byte_written
+                }
+            }, f)
+
+
+def set_profiler(profiler):
+    """
+    Sets the profiler of the generation of RST index files
+
+    :param profiler: profiler, ``None`` for disabling profiling
+    :type profiler: GenerationProfiler
+
+    :returns: previous profiler
+    :rtype: GenerationProfiler
+    """
+
+    global _profiler
+
+    previous_profiler = _profiler
+    _profiler = profiler
+
+    return previous_profiler
+
+
+class RSTDocument():
+    """
+    RST index file that is built in memory and written at once on the disk
+    with :meth:`.flush`, so that the file is opened once instead of once per
+    written line
+
+    :param index_path: path to the RST file, may be ``None`` if the document
+        is not meant to be flushed
+    :type index_path: str
+    :param page_dict: dictionary where the document is stored when flushed
+        instead of being written on the disk (key is ``index_path``, value is
+        the content), ``None`` for writing on the disk
+    :type page_dict: dict
+    """
+
+    def __init__(self, index_path, page_dict=None):
+        #: (*str*) Path to the RST file
+        self.index_path = index_path
+
+        #: (*dict*) Pages in memory where the document is stored when flushed,
+        #: ``None`` if it is written on the disk
+        self.page_dict = page_dict
+
+        #: (*list*) Pieces of text written in the document since the last
+        #: flush
+        self.chunk_list = []
+
+    def write(self, text):
+        """
+        Writes text in the document
+
+        :param text: text to write
+        :type text: str
+        """
+
+        self.chunk_list.append(text)
+
+    def getvalue(self):
+        """
+        Gets the content of the document that is not flushed yet
+
+        :rtype: str
+        """
+
+        return ''.join(self.chunk_list)
+
+    def clear(self):
+        """
+        Clears the content of the document that is not flushed yet
+        """
+
+        self.chunk_list = []
+
+    def flush(self, file_option='w', flag_if_changed=False):
+        """
+        Writes the content of the document in the RST file (or in the pages
+        in memory, see attribute :attr:`.page_dict`) and clears it
+
+        :param file_option: mode when opening the RST file
+        :type file_option: str
+        :param flag_if_changed: specify if the RST file is written only if its
+            current content is different from the content of the document
+            (then its modification time is kept when it is unchanged), only
+            used if ``file_option`` is ``'w'``
+        :type flag_if_changed: bool
+
+        :returns: specify if the RST file has been written
+        :rtype: bool
+        """
+
+        if _profiler is not None:
+            start = perf_counter()
+
+        content = self.getvalue()
+        self.clear()
+
+        # store document in memory
+        if self.page_dict is not None:
+            if file_option == 'a':
+                content = self.page_dict.get(self.index_path, '') + content
+
+            self.page_dict[self.index_path] = content
+
+            return True
+
+        # check if RST file is unchanged
+        if flag_if_changed and file_option == 'w' and isfile(self.index_path):
+            if _profiler is not None:
+                _profiler.count_file_open()
+
+            with open(self.index_path, 'r') as f:
+                if f.read() == content:
+                    return False
+
+        with open(self.index_path, file_option) as f:
+            f.write(content)
+
+        if _profiler is not None:
+            _profiler.count_file_open(len(content.encode()))
+            _profiler.add_event("write", self.index_path, start)
+
+        return True
+
+
+@contextmanager
+def open_document(index_path, file_option='a'):
+    """
+    Context manager for writing in a RST index file through a
+    :class:`.RSTDocument`
+
+    If ``index_path`` is already a :class:`.RSTDocument`, it is used as is
+    (and cleared if ``file_option`` is ``'w'``). Otherwise, a temporary
+    :class:`.RSTDocument` is created and flushed when exiting the context.
+
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
+    :param file_option: mode when opening the RST file
+    :type file_option: str
+
+    :returns: context manager yielding the :class:`.RSTDocument`
+    """
+
+    if isinstance(index_path, RSTDocument):
+        if file_option == 'w':
+            index_path.clear()
+
+        yield index_path
+
+    else:
+        document = RSTDocument(index_path)
+        yield document
+        document.flush(file_option)
+
+
+class MemberCache():
+    """
+    Persistent cache of the members of the modules (global variables, classes
+    and functions, see :func:`.get_module_members`), stored in a SQLite
+    database, so that a module is not imported again if its source code is
+    unchanged since a previous generation
+
+    An entry is identified by the path to the module source code file, the
+    hash of its content (see :func:`.get_source_hash`), the version of the
+    Python interpreter and the backend used for getting the members. The
+    least recently used entries are evicted when the number of entries
+    exceeds ``max_size``.
+
+    :param cache_path: path to the SQLite database file (created if
+        necessary), e.g. inside the build directory of the documentation
+    :type cache_path: str
+    :param max_size: maximum number of entries in the cache
+    :type max_size: int
+    """
+
+    def __init__(self, cache_path, max_size=10000):
+        #: (*int*) Maximum number of entries in the cache
+        self.max_size = max_size
+
+        #: (*str*) Path to the SQLite database file
+        self.cache_path = cache_path
+
+        #: (*int*) Number of bytes of the entries stored since the database
+        #: has been opened, see :class:`.GenerationProfiler`
+        self.nb_byte_written = 0
+
+        if _profiler is not None:
+            _profiler.count_file_open()
+
+        #: (:class:`sqlite3.Connection`) Connection to the database
+        self.connection = sqlite3.connect(cache_path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS members ("
+            "module_path TEXT, source_hash TEXT, interpreter TEXT, "
+            "backend TEXT, member_json TEXT, last_used REAL, "
+            "PRIMARY KEY (module_path, source_hash, interpreter, backend))"
+        )
+
+    def get(self, module_path, source_hash, backend):
+        """
+        Gets the members of a module in the cache
+
+        :param module_path: path to the source code file of the module
+        :type module_path: str
+        :param source_hash: hash of the source code file
+        :type source_hash: str
+        :param backend: see :func:`.get_module_members`
+        :type backend: str
+
+        :returns: see output of :func:`.get_module_members`, ``None`` if the
+            module is not in the cache
+        :rtype: tuple
+        """
+
+        key = (abspath(module_path), source_hash, version, backend)
+        row = self.connection.execute(
+            "SELECT member_json FROM members WHERE module_path = ? AND "
+            "source_hash = ? AND interpreter = ? AND backend = ?", key
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        # update time of last use
+        self.connection.execute(
+            "UPDATE members SET last_used = ? WHERE module_path = ? AND "
+            "source_hash = ? AND interpreter = ? AND backend = ?",
+            (time(),) + key
+        )
+
+        return tuple(json.loads(row[0]))
+
+    def set(self, module_path, source_hash, backend, member_tuple):
+        """
+        Stores the members of a module in the cache
+
+        :param module_path: path to the source code file of the module
+        :type module_path: str
+        :param source_hash: hash of the source code file
+        :type source_hash: str
+        :param backend: see :func:`.get_module_members`
+        :type backend: str
+        :param member_tuple: see output of :func:`.get_module_members`
+        :type member_tuple: tuple
+        """
+
+        member_json = json.dumps(member_tuple)
+        self.nb_byte_written += len(member_json.encode())
+        self.connection.execute(
+            "INSERT OR REPLACE INTO members VALUES (?, ?, ?, ?, ?, ?)", (
+                abspath(module_path), source_hash, version, backend,
+                member_json, time()
+            )
+        )
+
+    def close(self):
+        """
+        Evicts the least recently used entries exceeding the maximum size of
+        the cache, saves the cache and closes the connection to the database
+        """
+
+        if _profiler is not None:
+            start = perf_counter()
+
+        self.connection.execute(
+            "DELETE FROM members WHERE rowid NOT IN (SELECT rowid FROM "
+            "members ORDER BY last_used DESC LIMIT ?)", (self.max_size,)
+        )
+        self.connection.commit()
+        self.connection.close()
+
+        if _profiler is not None:
+            _profiler.count_byte_written(self.nb_byte_written)
+            _profiler.add_event("write", self.cache_path, start)
+
+
+class ImportSandbox():
+    """
+    Pool of worker processes where the modules are imported and introspected
+    (see :func:`.introspect_module`), so that the main process imports none
+    of them and only receives the lists of members
+
+    A module whose import fails, exceeds the timeout or the memory limit is
+    recorded in the attribute :attr:`.failure_dict` instead of stopping the
+    generation. If the workers are stuck (e.g. in code that the timeout
+    cannot interrupt), they are terminated after the timeout plus
+    :data:`.SANDBOX_GRACE_TIME` (their process identifiers are reported by
+    :func:`.report_worker_pid` when they start, from Python 3.7). The
+    modules that were lost with a terminated or crashed worker are submitted
+    once again to new workers, one at a time after the other modules, so that
+    a module crashing again is the only one recorded as failed.
+
+    :param jobs: number of worker processes
+    :type jobs: int
+    :param backend: see :func:`.load_module`
+    :type backend: str
+    :param package_dir: see :func:`.introspect_module`
+    :type package_dir: str
+    :param timeout: maximum duration in seconds of the introspection of a
+        module, ``None`` for no timeout
+    :type timeout: float
+    :param memory_limit: maximum size of the address space of each worker
+        process in megabytes, ``None`` for no limit
+    :type memory_limit: int
+    """
+
+    def __init__(
+        self, jobs=1, backend="import", package_dir=None, timeout=None,
+        memory_limit=None
+    ):
+        #: (*int*) Number of worker processes
+        self.jobs = jobs
+
+        #: (*str*) See :func:`.load_module`
+        self.backend = backend
+
+        #: (*str*) See :func:`.introspect_module`
+        self.package_dir = package_dir
+
+        #: (*float*) Maximum duration in seconds of the introspection of a
+        #: module
+        self.timeout = timeout
+
+        #: (*int*) Maximum size of the address space of each worker process
+        #: in megabytes
+        self.memory_limit = memory_limit
+
+        #: (*dict*) Report of the modules that could not be introspected, key
+        #: is the module full name, value is the error message
+        self.failure_dict = {}
+
+        #: (:class:`concurrent.futures.ProcessPoolExecutor`) Pool of worker
+        #: processes, created at the first submission
+        self.executor = None
+
+        # queue where the worker processes of the pool report their process
+        # identifier, and set of the identifiers already received
+        self.pid_queue = None
+        self.pid_set = set()
+
+        # submitted tasks, key is the task, value is a tuple with the module
+        # full name, the data given at submission, the number of attempts and
+        # the pool of worker processes
+        self.future_dict = {}
+
+        # modules lost with a terminated worker, to be submitted again, list
+        # of tuples with the module full name and the data given at submission
+        self.retry_list = []
+
+    def submit(self, module_full_name, data=None, nb_attempt=1):
+        """
+        Submits the introspection of a module to the worker processes
+
+        :param module_full_name: full name of the module
+        :type module_full_name: str
+        :param data: data returned along with the members of the module, see
+            :meth:`.iter_results`
+        :param nb_attempt: number of the attempt of introspection
+        :type nb_attempt: int
+        """
+
+        if self.executor is None:
+            if version_info >= (3, 7):
+                self.pid_queue = SimpleQueue()
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.jobs, initializer=report_worker_pid,
+                    initargs=(self.pid_queue,)
+                )
+
+            else:
+                self.executor = ProcessPoolExecutor(max_workers=self.jobs)
+
+        future = self.executor.submit(
+            introspect_module, module_full_name, self.backend,
+            self.package_dir, _profiler is not None, self.timeout,
+            self.memory_limit
+        )
+        self.future_dict[future] = (
+            module_full_name, data, nb_attempt, self.executor
+        )
+
+    def iter_results(self):
+        """
+        Generator of the results of the submitted modules, in order of
+        completion
+
+        :returns: generator yielding tuples with the module full name, the
+            data given at submission and the members of the module (see
+            output of :func:`.get_module_members`, ``None`` if the module
+            could not be introspected)
+        """
+
+        # get maximum duration without any completed task
+        if self.timeout is not None:
+            wait_timeout = self.timeout + SANDBOX_GRACE_TIME
+        else:
+            wait_timeout = None
+
+        while len(self.future_dict) > 0 or len(self.retry_list) > 0:
+            # submit again a lost module, alone
+            if len(self.future_dict) == 0:
+                module_full_name, data = self.retry_list.pop(0)
+                self.submit(module_full_name, data, nb_attempt=2)
+
+            done_set, _ = wait(
+                list(self.future_dict.keys()), timeout=wait_timeout,
+                return_when=FIRST_COMPLETED
+            )
+
+            # check if workers are stuck
+            if len(done_set) == 0:
+                self.terminate()
+                continue
+
+            # loop on completed tasks
+            for future in done_set:
+                module_full_name, data, nb_attempt, executor = \
+                    self.future_dict.pop(future)
+
+                try:
+                    member_tuple, event_list = future.result()
+
+                except BrokenProcessPool:
+                    # replace broken pool of worker processes
+                    if executor is self.executor:
+                        self.shutdown()
+
+                    # submit again module lost with a terminated worker
+                    if nb_attempt == 1:
+                        self.retry_list.append((module_full_name, data))
+                        continue
+
+                    self.failure_dict[module_full_name] = \
+                        "worker process terminated abruptly"
+                    member_tuple = None
+
+                except Exception as error:
+                    self.failure_dict[module_full_name] = \
+                        type(error).__name__
+                    if str(error) != '':
+                        self.failure_dict[module_full_name] += ": %s" % error
+
+                    member_tuple = None
+
+                else:
+                    # get profiling events of the worker process
+                    if _profiler is not None:
+                        _profiler.merge_events(event_list)
+
+                yield module_full_name, data, member_tuple
+
+    def terminate(self):
+        """
+        Terminates the worker processes, the running and pending tasks fail
+        """
+
+        # get process identifiers reported by the workers
+        if self.pid_queue is not None:
+            while not self.pid_queue.empty():
+                self.pid_set.add(self.pid_queue.get())
+
+        # loop on worker processes
+        for pid in self.pid_set:
+            try:
+                kill(pid, signal.SIGTERM)
+
+            # process already ended
+            except OSError:
+                pass
+
+    def shutdown(self):
+        """
+        Shuts down the pool of worker processes
+        """
+
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+            self.pid_queue = None
+            self.pid_set = set()
 
 
 def write_section(index_path, title, level=0, file_option='a'):
     """
     Writes a section in a RST index file
 
-    :param index_path: path to the RST file
-    :type index_path: str
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
     :param title: section title
     :type title: str
     :param level: section level (``0`` page title, ``1`` section,
@@ -46,7 +778,7 @@ def write_section(index_path, title, level=0, file_option='a'):
     elif level == 3:
         section_line = '^' * title_length
 
-    with open(index_path, file_option) as f:
+    with open_document(index_path, file_option) as f:
         if level == 0:
             f.write(section_line)
             f.write('\n')
@@ -61,11 +793,11 @@ def write_toc_tree_directive(index_path):
     """
     Writes directive for table of content in RST index file
 
-    :param index_path: path to the RST file
-    :type index_path: str
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
     """
 
-    with open(index_path, 'a') as f:
+    with open_document(index_path) as f:
         f.write(".. toctree::\n   :titlesonly:\n\n")
 
 
@@ -73,13 +805,13 @@ def write_toc_tree_index(index_path, index_link):
     """
     Writes index inside a table of content in RST index file
 
-    :param index_path: path to the RST file
-    :type index_path: str
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
     :param index_link: name of the folder containing the index file to point to
     :type index_link: str
     """
 
-    with open(index_path, 'a') as f:
+    with open_document(index_path) as f:
         f.write('   ' + index_link + '/index\n')
 
 
@@ -87,11 +819,11 @@ def write_autosummary_directive(index_path):
     """
     Writes autosummary directive in RST index file
 
-    :param index_path: path to the RST file
-    :type index_path: str
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
     """
 
-    with open(index_path, 'a') as f:
+    with open_document(index_path) as f:
         f.write(".. autosummary::\n")
 
 
@@ -99,13 +831,13 @@ def write_automodule_directive(index_path, module_full_name):
     """
     Writes automodule directive in RST index file
 
-    :param index_path: path to the RST file
-    :type index_path: str
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
     :param module_full_name: full name of the module inside the package
     :type module_full_name: str
     """
 
-    with open(index_path, 'a') as f:
+    with open_document(index_path) as f:
         f.write(".. automodule:: %s\n\n" % module_full_name)
 
 
@@ -113,13 +845,13 @@ def write_automember(index_path, member_full_name):
     """
     Writes member inside autosummary directive in RST index file
 
-    :param index_path: path to the RST file
-    :type index_path: str
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
     :param member_full_name: full name of the member inside the package
     :type member_full_name: str
     """
 
-    with open(index_path, 'a') as f:
+    with open_document(index_path) as f:
         f.write("   %s\n" % member_full_name)
 
 
@@ -128,15 +860,15 @@ def write_autofunction_directive(index_path, module_full_name, func_list):
     Writes autofunction directive in RST index file for a set of functions
     inside the same module
 
-    :param index_path: path to the RST file
-    :type index_path: str
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
     :param module_full_name: full name of the module inside the package
     :type module_full_name: str
     :param func_list: list of functions name inside the module
     :type func_list: list
     """
 
-    with open(index_path, 'a') as f:
+    with open_document(index_path) as f:
         for func_name in func_list:
             f.write(
                 ".. autofunction:: %s.%s\n" % (module_full_name, func_name)
@@ -150,15 +882,15 @@ def write_autodata_directive(index_path, module_full_name, data_list):
     Writes autodata directive in RST index file for a set of data inside the
     same module
 
-    :param index_path: path to the RST file
-    :type index_path: str
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
     :param module_full_name: full name of the module inside the package
     :type module_full_name: str
     :param data_list: list of data name inside the module
     :type data_list: list
     """
 
-    with open(index_path, 'a') as f:
+    with open_document(index_path) as f:
         for data_name in data_list:
             f.write(".. autodata:: %s.%s\n" % (module_full_name, data_name))
 
@@ -169,13 +901,13 @@ def write_autoclass_directive(index_path, class_full_name):
     """
     Writes autoclass directive in RST index file
 
-    :param index_path: path to the RST file
-    :type index_path: str
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
     :param class_full_name: full name of the class inside the package
     :type class_full_name: str
     """
 
-    with open(index_path, 'a') as f:
+    with open_document(index_path) as f:
         f.write(".. autoclass:: %s\n" % class_full_name)
         f.write("   :members:\n")
         f.write("   :undoc-members:\n")
@@ -190,8 +922,8 @@ def write_module_summary(
     """
     Writes summary of a module for a specific type of member in RST index file
 
-    :param index_path: path to the RST file
-    :type index_path: str
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
     :param module_full_name: full name of the module inside the package
     :type module_full_name: str
     :param member_list: list of the members inside the module (all elements are
@@ -217,7 +949,7 @@ def write_module_summary(
             )
 
         # write empty line in index file
-        with open(index_path, 'a') as f:
+        with open_document(index_path) as f:
             f.write('\n')
 
 
@@ -225,8 +957,8 @@ def write_api_data(index_path, module_full_name, data_list):
     """
     Writes "Data" section
 
-    :param index_path: path to the RST file
-    :type index_path: str
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
     :param module_full_name: full name of the module inside the package
     :type module_full_name: str
     :param data_list: list of the data inside the module
@@ -248,8 +980,8 @@ def write_api_classes(index_path, module_full_name, class_list):
     """
     Writes "Classes" section
 
-    :param index_path: path to the RST file
-    :type index_path: str
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
     :param module_full_name: full name of the module inside the package
     :type module_full_name: str
     :param class_list: list of the classes inside the module
@@ -272,8 +1004,8 @@ def write_api_functions(index_path, module_full_name, func_list):
     """
     Writes "Functions" section
 
-    :param index_path: path to the RST file
-    :type index_path: str
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
     :param module_full_name: full name of the module inside the package
     :type module_full_name: str
     :param func_list: list of the functions inside the module
@@ -291,25 +1023,51 @@ def write_api_functions(index_path, module_full_name, func_list):
         )
 
 
-def write_module_index(index_path, module, module_full_name):
+def write_module_index(
+    index_path, module, module_full_name, backend="import"
+):
     """
     Writes API page of a module
 
-    :param index_path: path to the RST file
-    :type index_path: str
-    :param module: imported module
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
+    :param module: imported module, or module loaded with
+        :func:`.load_module_static` if ``backend`` is ``"ast"``
     :param module_full_name: full name of the module inside the package
     :type module_full_name: str
+    :param backend: see :func:`.get_module_members`
+    :type backend: str
     """
 
-    # get list of global variables in the module
-    data_list = get_members_defined_in_module(module, '')
+    # get lists of global variables, classes and functions in the module
+    data_list, class_list, func_list = get_module_members(module, backend)
+
+    # write API page
+    write_module_members_index(
+        index_path, module_full_name, data_list, class_list, func_list
+    )
+
+
+def write_module_members_index(
+    index_path, module_full_name, data_list, class_list, func_list
+):
+    """
+    Writes API page of a module given its members
 
-    # get list of classes in the module
-    class_list = get_members_defined_in_module(module, isclass)
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
+    :param module_full_name: full name of the module inside the package
+    :type module_full_name: str
+    :param data_list: names of the global variables in the module
+    :type data_list: list
+    :param class_list: names of the classes in the module
+    :type class_list: list
+    :param func_list: names of the functions in the module
+    :type func_list: list
+    """
 
-    # get list of functions in the module
-    func_list = get_members_defined_in_module(module, isfunction)
+    if _profiler is not None:
+        start = perf_counter()
 
     # write title of summary section
     write_section(index_path, "Summary", level=1)
@@ -344,40 +1102,129 @@ def write_module_index(index_path, module, module_full_name):
     # write documentation for functions
     write_api_functions(index_path, module_full_name, func_list)
 
+    if _profiler is not None:
+        _profiler.add_event("render", module_full_name, start)
+
 
 def write_package_index(
-    index_path, package, package_full_name, out_dir
+    index_path, package, package_full_name, out_dir, backend="import",
+    manifest=None, member_cache=None, page_dict=None
 ):
     """
     Writes all RST index files of a package
 
-    :param index_path: path to the RST file
-    :type index_path: str
-    :param package: imported package
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
+    :param package: imported package, or package loaded with
+        :func:`.load_module_static` if ``backend`` is ``"ast"`` (not used
+        anymore, its sub-packages/modules are found with
+        :func:`.module_tree.get_module_node`)
     :param package_full_name: full name of the package
     :type package_full_name: str
     :param out_dir: directory where to save RST index files
     :type out_dir: str
+    :param backend: see :func:`.get_module_members`
+    :type backend: str
+    :param manifest: see :func:`.generate_index_files_iterative`
+    :type manifest: dict
+    :param member_cache: see :func:`.generate_index_files_iterative`
+    :type member_cache: MemberCache
+    :param page_dict: see :func:`.generate_index_files_iterative`
+    :type page_dict: dict
+    """
+
+    # get sub-packages/modules
+    sub_package_list = get_module_node(package_full_name)["sub_package_list"]
+
+    # write toc tree
+    write_package_toc_tree(index_path, sub_package_list)
+
+    # create index files for sub-packages
+    generate_index_files_iterative(
+        [
+            make_module_node(
+                "%s.%s" % (package_full_name, sub_package_name),
+                "%s/%s" % (out_dir, sub_package_name)
+            ) for sub_package_name in sub_package_list
+        ], backend=backend, manifest=manifest, member_cache=member_cache,
+        page_dict=page_dict
+    )
+
+
+def write_package_toc_tree(index_path, sub_package_list):
+    """
+    Writes the table of content of a package in its RST index file
+
+    :param index_path: path to the RST file or in-memory RST document
+    :type index_path: str or RSTDocument
+    :param sub_package_list: names of the sub-packages/modules of the package
+    :type sub_package_list: list
     """
 
     # write directive for toc tree
     write_toc_tree_directive(index_path)
 
     # loop on sub-packages
-    for sub_package_name in package.__all__:
+    for sub_package_name in sub_package_list:
         # write a link to sub-package index in the toc tree
         write_toc_tree_index(index_path, sub_package_name)
 
-        # recursive call
-        generate_index_files_recursive(
-            ".%s" % sub_package_name, package_full_name, out_dir
-        )
+
+def classify_module_members(module):
+    """
+    Gets the global variables, classes and functions defined in a module
+    (imported members are ignored), with the same filtering as
+    :func:`.get_members_defined_in_module`
+
+    The attribute ``__dict__`` of the module is walked once (instead of
+    calling :func:`inspect.getmembers` for each type of member, which gets
+    every attribute of the module), and the result is cached for each module
+    object.
+
+    :param module: imported module
+
+    :returns:
+        - **data_list** (*list*) -- names of the global variables
+        - **class_list** (*list*) -- names of the classes
+        - **func_list** (*list*) -- names of the functions
+
+        Each list is sorted by name.
+    """
+
+    # check if module already classified
+    if module in _module_member_cache:
+        return _module_member_cache[module]
+
+    # initialize lists of members
+    data_list, class_list, func_list = [], [], []
+
+    # loop on members
+    for member_name, member in sorted(vars(module).items()):
+        # check if member is defined in the module
+        if hasattr(member, "__module__"):
+            if member.__module__ == module.__name__:
+                if isclass(member):
+                    class_list.append(member_name)
+
+                elif isfunction(member):
+                    func_list.append(member_name)
+
+        # check if global variable
+        elif not ismodule(member) and member_name not in STANDARD_GLOBAL_LIST:
+            data_list.append(member_name)
+
+    _module_member_cache[module] = (data_list, class_list, func_list)
+
+    return data_list, class_list, func_list
 
 
 def get_members_defined_in_module(module, condition_function):
     """
     Get members that are defined in a module (imported members are ignored)
 
+    Global variables, classes and functions are given by
+    :func:`.classify_module_members`.
+
     :param module: imported module
     :param condition_function: may be any 'isXXX' function of the module
         ``inspect``, ``None`` (get everything) or '' (get global variables),
@@ -388,17 +1235,13 @@ def get_members_defined_in_module(module, condition_function):
     """
 
     if isinstance(condition_function, str):
-        # get list of all members in the module that are not part of a module
-        # and remove modules (=> so that we only keep global variables)
-        # and remove standard global variables
-        member_list = [
-            member[0] for member in getmembers(module)
-            if not hasattr(member[1], "__module__") and not ismodule(member[1])
-            and member[0] not in [
-                "__builtins__", "__cached__", "__doc__", "__file__",
-                "__name__", "__package__"
-            ]
-        ]
+        member_list = list(classify_module_members(module)[0])
+
+    elif condition_function is isclass:
+        member_list = list(classify_module_members(module)[1])
+
+    elif condition_function is isfunction:
+        member_list = list(classify_module_members(module)[2])
 
     else:
         # get list of members with respect to condition function
@@ -412,165 +1255,2035 @@ def get_members_defined_in_module(module, condition_function):
     return member_list
 
 
-def generate_index_files_recursive(
-    package_name, package_root_name, out_dir
-):
+def is_main_block(node):
     """
-    Recursive function for writing RST index files of a (sub-)package/module
-    and all sub-packages/modules
+    Checks if a statement is the block ``if __name__ == "__main__":``
 
-    The function :func:`importlib.import_module` is used to import the
-    package/module, see
-    https://docs.python.org/3/library/importlib.html#importlib.import_module
+    :param node: statement
+    :type node: ast.stmt
 
-    :param package_name: name of the package, first positional argument of
-        :func:`importlib.import_module`
-    :type package_name: str
-    :param package_root_name: root of the package/module to import, keyword
-        argument of :func:`importlib.import_module`
-    :type package_root_name: str
-    :param out_dir: directory where to save the RST index files
-    :type out_dir: str
+    :rtype: bool
     """
 
-    # import package
-    package = import_module(package_name, package_root_name)
-
-    # check if not at the package root
-    if package_root_name is not None:
-        # create index directory
-        out_dir = "%s/%s" % (out_dir, package_name.replace('.', ''))
-        if not isdir(out_dir):
-            mkdir(out_dir)
+    if not isinstance(node, ast.If) or not isinstance(node.test, ast.Compare):
+        return False
 
-    # get package full name
-    if package_root_name is not None:
-        package_full_name = package_root_name + package_name
-    else:
-        package_full_name = package_name
+    operand_list = [node.test.left] + node.test.comparators
+    name_list = [
+        operand.id for operand in operand_list
+        if isinstance(operand, ast.Name)
+    ]
+    value_list = [
+        getattr(operand, "value", getattr(operand, "s", None))
+        for operand in operand_list if not isinstance(operand, ast.Name)
+    ]
 
-    # create index file
-    index_path = "%s/index.rst" % out_dir
-    write_section(index_path, package_full_name, file_option='w')
+    return len(node.test.ops) == 1 and isinstance(node.test.ops[0], ast.Eq) \
+        and name_list == ["__name__"] and value_list == ["__main__"]
 
-    # check if package indeed
-    if hasattr(package, "__all__"):
-        write_package_index(
-            index_path, package, package_full_name, out_dir
-        )
 
-    # module instead
-    else:
-        write_module_index(index_path, package, package_full_name)
+def iter_module_scope_nodes(node_list):
+    """
+    Generator of the statements that are executed in the scope of a module,
+    i.e. the statements at the first level of the source code and the ones
+    nested in control flow blocks (``if``, ``try``, ``for``, ``while``,
+    ``with``)
 
+    :param node_list: list of statements, see attribute ``body`` of
+        :class:`ast.Module`
+    :type node_list: list
 
-def generate_index_files(
-    package_name, doc_dir, package_dir=None, output_name="APIreference",
-    chapter_title="API reference", flag_include_main=False
-):
+    :returns: generator of :class:`ast.stmt`
     """
-    Main function for writing RST index files of a package/module and all
-    sub-packages/modules
 
-    First, it creates the output directory and the RST index file at the first
-    level of the package. Then, it creates the directories corresponding to the
-    package structure and the RST index files thanks to the recursive function
-    :func:`.generate_index_files_recursive`.
+    for node in node_list:
+        yield node
 
-    :param package_name: name of the package/module
-    :type package_name: str
-    :param doc_dir: directory where is stored the documentation source
-    :type doc_dir: str
-    :param package_dir: directory where is stored the package (to be temporally
-        added in the PYTHONPATH)
-    :type package_dir: str
-    :param output_name: name of the directory to create inside ``doc_dir``,
-        where to store RST index files
-    :type output_name: str
-    :param chapter_title: name of the chapter inside the whole documentation
-    :type chapter_title: str
-    :param flag_include_main: specify if the executable module ``__main__.py``
-        must be included in the documentation
-    :type flag_include_main: bool
-    """
+        # check if statement with nested blocks in module scope
+        if not isinstance(
+            node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+        ):
+            # check if main block, which is not executed when importing
+            if is_main_block(node):
+                block_name_list = ("orelse",)
+            else:
+                block_name_list = ("body", "orelse", "finalbody")
 
-    if package_dir is not None:
-        path.insert(0, abspath(package_dir))
+            # loop on nested blocks
+            for block_name in block_name_list:
+                yield from iter_module_scope_nodes(
+                    getattr(node, block_name, [])
+                )
 
-    setrecursionlimit(1500)
+            # loop on exception handlers
+            for handler in getattr(node, "handlers", []):
+                yield from iter_module_scope_nodes(handler.body)
 
-    # append API reference to toctree directive in main index file of the
-    # documentation
-    append_main_index_file("%s/index.rst" % doc_dir, output_name)
 
-    # get output directory where to store the index files
-    out_dir = "%s/%s" % (doc_dir, output_name)
+def get_target_names(target):
+    """
+    Gets the names bound by the target of an assignment
 
-    # delete directory if necessary
-    if isdir(out_dir):
-        rmtree(out_dir)
+    :param target: target of an assignment, e.g. attribute ``targets`` of
+        :class:`ast.Assign` or attribute ``target`` of :class:`ast.For`
+    :type target: ast.expr
 
-    # create directory
-    mkdir(out_dir)
+    :returns: list of names
+    :rtype: list
+    """
 
-    # create index file
-    index_path = "%s/index.rst" % out_dir
-    write_section(index_path, chapter_title, file_option='w')
+    if isinstance(target, ast.Name):
+        return [target.id]
 
-    # import package
-    package = import_module(package_name)
+    elif isinstance(target, (ast.Tuple, ast.List)):
+        name_list = []
+        for elt in target.elts:
+            name_list += get_target_names(elt)
+        return name_list
+
+    elif isinstance(target, ast.Starred):
+        return get_target_names(target.value)
+
+    return []
 
-    # write directive for toc tree
-    write_toc_tree_directive(index_path)
 
-    # loop on modules and sub-packages
-    for sub_package_name in package.__all__:
-        if not flag_include_main and sub_package_name == "__main__":
-            pass
+def get_assigned_member_type(value, member_dict):
+    """
+    Gets the type of a global variable from the value assigned to it in the
+    source code, with the same filtering as :func:`.classify_module_members`
+    as far as it can be guessed without executing the code: instances of
+    classes (e.g. ``logging.getLogger()``, ``re.compile()``,
+    ``TypeVar()``) are not documented, calls to
+    :data:`.CLASS_FACTORY_LIST` (e.g. ``namedtuple()``) are classes and
+    aliases of members of the module have the type of the member
+
+    :param value: assigned value, e.g. attribute ``value`` of
+        :class:`ast.Assign`
+    :type value: ast.expr
+    :param member_dict: types of the members of the module already found,
+        see :func:`.get_members_defined_in_source`
+    :type member_dict: dict
+
+    :returns: ``"data"``, ``"class"``, ``"function"`` or ``None`` if the
+        global variable is not documented
+    :rtype: str
+    """
 
+    # check if lambda function
+    if isinstance(value, ast.Lambda):
+        return "function"
+
+    # check if alias of a member of the module (other names are imported or
+    # built-in members)
+    if isinstance(value, ast.Name):
+        return member_dict.get(value.id)
+
+    # check if call
+    if isinstance(value, ast.Call):
+        if isinstance(value.func, ast.Name):
+            func_name = value.func.id
+        elif isinstance(value.func, ast.Attribute):
+            func_name = value.func.attr
         else:
-            # write a link to sub-package index in the toc tree
-            write_toc_tree_index(index_path, sub_package_name)
+            func_name = None
 
-            # create index files for sub-package
-            generate_index_files_recursive(
-                ".%s" % sub_package_name, package_name, out_dir
-            )
+        if func_name in CLASS_FACTORY_LIST:
+            return "class"
 
+        elif isinstance(value.func, ast.Name) \
+                and func_name in BUILTIN_DATA_TYPE_LIST:
+            return "data"
 
-def append_main_index_file(main_index_path, api_ref_name):
-    """
-    Appends main RST index file of the documentation (which contains the
-    doctree of the whole documentation) with the main RST index file of the
-    API reference
+        # instance of a class
+        return None
 
-    :param main_index_path: path to the main RST index file of the
-        documentation
-    :type main_index_path: str
-    :param api_ref_name: name of the directory containing the RST index files
-        of the API reference
-    :type api_ref_name: str
-    """
+    return "data"
 
-    with open(main_index_path, 'r') as f:
-        content_list = f.readlines()
-        if "   %s/index\n" % api_ref_name not in content_list:
-            start_ind = content_list.index(".. toctree::\n") + 1
-            for i, content in enumerate(content_list[start_ind:]):
-                if len(content) > 3 and content[:3] != '   ' or \
-                        len(content) < 3:
-                    break
 
-            end_ind = start_ind + i
-            if end_ind == len(content_list) - 1:
-                if content_list[-1][-1:] != '\n':
-                    content_list[-1] += '\n'
-                end_ind += 1
+def get_members_defined_in_source(module_path):
+    """
+    Get members that are defined in a module by parsing its source code with
+    :mod:`ast`, so that the module is not imported (nor executed)
 
-            content_list.insert(end_ind, "   %s/index\n" % api_ref_name)
+    Members imported from other modules are ignored. Since no code is
+    executed, the type of a global variable is guessed from the value
+    assigned to it, see :func:`.get_assigned_member_type`.
 
-    with open(main_index_path, 'w') as f:
-        f.writelines(content_list)
+    :param module_path: path to the source code file of the module
+    :type module_path: str
+
+    :returns:
+        - **data_list** (*list*) -- names of the global variables
+        - **class_list** (*list*) -- names of the classes
+        - **func_list** (*list*) -- names of the functions
+
+        Each list is sorted, similarly to the output of
+        :func:`.get_members_defined_in_module`.
+    """
+
+    # parse source code
+    with open(module_path, 'rb') as f:
+        tree = ast.parse(f.read(), module_path)
+
+    # initialize dictionary with the type of each member (the last binding of
+    # a name in the source code sets its type)
+    member_dict = {}
+
+    # loop on statements in module scope
+    for node in iter_module_scope_nodes(tree.body):
+        if isinstance(node, ast.ClassDef):
+            member_dict[node.name] = "class"
+
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            member_dict[node.name] = "function"
+
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            # check if annotation without value
+            if node.value is None:
+                continue
+
+            # get type of the global variables (single target for an
+            # annotated assignment, several ones for chained assignments)
+            member_type = get_assigned_member_type(node.value, member_dict)
+            if isinstance(node, ast.Assign):
+                target_list = node.targets
+            else:
+                target_list = [node.target]
+
+            for target in target_list:
+                for name in get_target_names(target):
+                    if member_type is None:
+                        member_dict.pop(name, None)
+                    else:
+                        member_dict[name] = member_type
+
+        elif isinstance(node, (ast.For, ast.AsyncFor)):
+            for name in get_target_names(node.target):
+                member_dict[name] = "data"
+
+        elif isinstance(node, (ast.With, ast.AsyncWith)):
+            for item in node.items:
+                if item.optional_vars is not None:
+                    for name in get_target_names(item.optional_vars):
+                        member_dict[name] = "data"
+
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                name = alias.asname or alias.name.split('.')[0]
+                member_dict.pop(name, None)
+
+        elif isinstance(node, ast.Delete):
+            for target in node.targets:
+                for name in get_target_names(target):
+                    member_dict.pop(name, None)
+
+    # remove standard global variables
+    for name in STANDARD_GLOBAL_LIST:
+        member_dict.pop(name, None)
+
+    # get lists of members with respect to their type
+    data_list, class_list, func_list = [], [], []
+    for name in sorted(member_dict.keys()):
+        if member_dict[name] == "class":
+            class_list.append(name)
+
+        elif member_dict[name] == "function":
+            func_list.append(name)
+
+        else:
+            data_list.append(name)
+
+    return data_list, class_list, func_list
+
+
+def get_module_members(module, backend="import"):
+    """
+    Gets the global variables, classes and functions defined in a module
+
+    :param module: imported module, or module loaded with
+        :func:`.load_module_static` if ``backend`` is ``"ast"``
+    :param backend: ``"import"`` for introspection of the imported module
+        with :func:`.classify_module_members`, ``"ast"`` for parsing
+        its source code with :func:`.get_members_defined_in_source`
+    :type backend: str
+
+    :returns:
+        - **data_list** (*list*) -- names of the global variables
+        - **class_list** (*list*) -- names of the classes
+        - **func_list** (*list*) -- names of the functions
+    """
+
+    if _profiler is not None:
+        start = perf_counter()
+
+    if backend == "ast":
+        member_tuple = get_members_defined_in_source(module.__file__)
+    else:
+        member_tuple = classify_module_members(module)
+
+    if _profiler is not None:
+        _profiler.add_event("classify", module.__name__, start)
+
+    return member_tuple
+
+
+def load_module_static(module_full_name):
+    """
+    Loads a module without executing it: the returned module object only has
+    the attributes ``__name__`` and ``__file__`` (the sub-packages/modules of
+    a package are found with :func:`.module_tree.get_sub_module_names`)
+
+    :param module_full_name: full name of the module
+    :type module_full_name: str
+
+    :returns: module object
+    :rtype: types.ModuleType
+    """
+
+    # find module
+    spec = find_module_spec(module_full_name)
+
+    # create empty module
+    module = ModuleType(module_full_name)
+    module.__file__ = spec.origin
+
+    return module
+
+
+def load_module(package_name, package_root_name=None, backend="import"):
+    """
+    Loads a package/module
+
+    :param package_name: name of the package, first positional argument of
+        :func:`importlib.import_module`
+    :type package_name: str
+    :param package_root_name: root of the package/module to import, keyword
+        argument of :func:`importlib.import_module`
+    :type package_root_name: str
+    :param backend: ``"import"`` for importing the package/module with
+        :func:`importlib.import_module`, ``"ast"`` for loading it without
+        execution with :func:`.load_module_static`
+    :type backend: str
+
+    :returns: module object
+    :rtype: types.ModuleType
+    """
+
+    if _profiler is not None:
+        start = perf_counter()
+
+    if backend == "ast":
+        if package_root_name is not None:
+            package_name = package_root_name + package_name
+
+        module = load_module_static(package_name)
+
+    else:
+        module = import_module(package_name, package_root_name)
+
+    if _profiler is not None:
+        _profiler.add_event("import", module.__name__, start)
+
+    return module
+
+
+def generate_index_files_recursive(
+    package_name, package_root_name, out_dir, backend="import", manifest=None,
+    member_cache=None, page_dict=None
+):
+    """
+    Writes RST index files of a (sub-)package/module and all
+    sub-packages/modules, kept for compatibility, the package is walked with
+    :func:`.generate_index_files_iterative`
+
+    :param package_name: name of the package, first positional argument of
+        :func:`importlib.import_module`
+    :type package_name: str
+    :param package_root_name: root of the package/module to import, keyword
+        argument of :func:`importlib.import_module`
+    :type package_root_name: str
+    :param out_dir: directory where to save the RST index files
+    :type out_dir: str
+    :param backend: see :func:`.load_module`
+    :type backend: str
+    :param manifest: see :func:`.generate_index_files_iterative`
+    :type manifest: dict
+    :param member_cache: see :func:`.generate_index_files_iterative`
+    :type member_cache: MemberCache
+    :param page_dict: see :func:`.generate_index_files_iterative`
+    :type page_dict: dict
+    """
+
+    # check if not at the package root
+    if package_root_name is not None:
+        node = make_module_node(
+            package_root_name + package_name,
+            "%s/%s" % (out_dir, package_name.replace('.', ''))
+        )
+
+    else:
+        node = make_module_node(package_name, out_dir)
+
+    generate_index_files_iterative(
+        [node], backend=backend, manifest=manifest,
+        member_cache=member_cache, page_dict=page_dict
+    )
+
+
+def make_module_node(module_full_name, out_dir):
+    """
+    Creates a node of the tree of packages/modules walked by
+    :func:`.iter_module_tree`
+
+    :param module_full_name: full name of the package/module
+    :type module_full_name: str
+    :param out_dir: directory where to save its RST index file
+    :type out_dir: str
+
+    :returns: node, dictionary with the following keys:
+
+        - ``"name"``: full name of the package/module,
+        - ``"out_dir"``: directory where to save its RST index file,
+        - ``"spec"``: its specification (see :func:`.find_module_spec`),
+          ``None`` if not found yet,
+        - ``"sub_package_list"``: names of its sub-packages/modules, ``None``
+          if it is a module or if they are not found yet.
+    :rtype: dict
+    """
+
+    return {
+        "name": module_full_name, "out_dir": out_dir, "spec": None,
+        "sub_package_list": None
+    }
+
+
+def apply_node_stages(node_list, stage_list=None):
+    """
+    Applies stages to nodes entering the work queue of
+    :func:`.iter_module_tree`
+
+    :param node_list: nodes, see :func:`.make_module_node`
+    :type node_list: list
+    :param stage_list: functions applied in turn to each node, with the node
+        as only argument, they return the node (possibly modified) or
+        ``None`` for removing it (its sub-packages/modules are then not
+        walked nor listed in the table of content of its package), e.g. for
+        filtering modules
+    :type stage_list: list
+
+    :returns: nodes that are not removed
+    :rtype: list
+    """
+
+    if not stage_list:
+        return node_list
+
+    # initialize output
+    output_node_list = []
+
+    # loop on nodes
+    for node in node_list:
+        # loop on stages
+        for stage in stage_list:
+            node = stage(node)
+            if node is None:
+                break
+
+        else:
+            output_node_list.append(node)
+
+    return output_node_list
+
+
+def iter_module_tree(node_list, expand_function, flag_breadth_first=False):
+    """
+    Generator walking a tree of packages/modules with a work queue instead of
+    recursive calls, so that the depth of the tree is not limited
+
+    :param node_list: root nodes, see :func:`.make_module_node`
+    :type node_list: list
+    :param expand_function: function processing a node (only argument) and
+        returning its child nodes (sub-packages/modules)
+    :param flag_breadth_first: specify if the tree is walked breadth first
+        (all packages/modules of a level before the next level), instead of
+        depth first (a package followed by all its sub-packages/modules)
+    :type flag_breadth_first: bool
+
+    :returns: generator yielding the processed nodes, parents before children
+    """
+
+    # initialize work queue (nodes are popped from its end if depth first)
+    if flag_breadth_first:
+        queue = deque(node_list)
+    else:
+        queue = deque(reversed(node_list))
+
+    while len(queue) > 0:
+        # get next node
+        if flag_breadth_first:
+            node = queue.popleft()
+        else:
+            node = queue.pop()
+
+        # process node
+        child_node_list = expand_function(node)
+
+        yield node
+
+        # add child nodes in the work queue
+        if flag_breadth_first:
+            queue.extend(child_node_list)
+        else:
+            queue.extend(reversed(child_node_list))
+
+
+def write_module_node(
+    node, backend="import", manifest=None, member_cache=None, page_dict=None,
+    flag_all=False, stage_list=None, module_index=None
+):
+    """
+    Writes the RST index file of a package/module of the work queue of
+    :func:`.generate_index_files_iterative`
+
+    :param node: package/module, see :func:`.make_module_node`
+    :type node: dict
+    :param backend: see :func:`.load_module`
+    :type backend: str
+    :param manifest: see :func:`.generate_index_files_iterative`
+    :type manifest: dict
+    :param member_cache: see :func:`.generate_index_files_iterative`
+    :type member_cache: MemberCache
+    :param page_dict: see :func:`.generate_index_files_iterative`
+    :type page_dict: dict
+    :param flag_all: see :func:`.module_tree.get_sub_module_names`
+    :type flag_all: bool
+    :param stage_list: see :func:`.apply_node_stages`
+    :type stage_list: list
+    :param module_index: see :func:`.generate_index_files_iterative`
+    :type module_index: module_tree.ModuleIndex
+
+    :returns: nodes of the sub-packages/modules (empty for a module)
+    :rtype: list
+    """
+
+    # find package/module and its sub-packages/modules without importing it
+    child_node_list = find_module_node(node, flag_all, stage_list)
+    spec = node["spec"]
+
+    # check if module is unchanged since previous incremental generation
+    flag_unchanged, source_hash = prepare_module_node(
+        node, manifest, member_cache, page_dict
+    )
+    if flag_unchanged:
+        return []
+
+    # initialize members of the module (none for a package)
+    member_tuple = None
+
+    # check if module (a package is not imported)
+    if spec.submodule_search_locations is None:
+        # get members of the module in the cache or in the index of modules
+        member_tuple = get_known_members(
+            spec, source_hash, backend, member_cache, module_index
+        )
+
+        if member_tuple is None:
+            # import module and get its members, store them
+            module = load_module(node["name"], backend=backend)
+            member_tuple = get_module_members(module, backend)
+            set_known_members(
+                spec, source_hash, backend, member_tuple, member_cache,
+                module_index
+            )
+
+    # write index file
+    write_node_index_file(node, member_tuple, manifest, page_dict)
+
+    return child_node_list
+
+
+def generate_index_files_iterative(
+    node_list, backend="import", manifest=None, member_cache=None,
+    page_dict=None, flag_breadth_first=False, flag_all=False, stage_list=None,
+    module_index=None
+):
+    """
+    Writes RST index files of (sub-)packages/modules and all their
+    sub-packages/modules, the package is walked with a work queue (see
+    :func:`.iter_module_tree`) and the packages/modules are imported in the
+    current process
+
+    The function :func:`importlib.import_module` is used to import the
+    package/module, see
+    https://docs.python.org/3/library/importlib.html#importlib.import_module
+
+    :param node_list: packages/modules, see :func:`.make_module_node`
+    :type node_list: list
+    :param backend: see :func:`.load_module`
+    :type backend: str
+    :param manifest: for incremental generation (``None`` otherwise),
+        dictionary with two keys:
+
+        - ``"previous"``: source hashes of the modules at the previous
+          generation, see output of :func:`.load_manifest`,
+        - ``"current"``: source hashes of the modules at the current
+          generation, it is filled by this function.
+
+        The RST index file of a module is not generated again if its source
+        hash is unchanged, and RST index files are written only if their
+        content is changed.
+    :type manifest: dict
+    :param member_cache: persistent cache of the members of the modules
+        (``None`` for no cache), a module is not imported if its members are
+        in the cache
+    :type member_cache: MemberCache
+    :param page_dict: dictionary where the RST index files are stored in
+        memory instead of being written on the disk (key is the path to the
+        RST file, value is its content), ``None`` for writing them on the disk
+    :type page_dict: dict
+    :param flag_breadth_first: see :func:`.iter_module_tree`
+    :type flag_breadth_first: bool
+    :param flag_all: see :func:`.module_tree.get_sub_module_names`
+    :type flag_all: bool
+    :param stage_list: see :func:`.apply_node_stages`, the stages are applied
+        to the sub-packages/modules found during the walk (``node_list`` is
+        not filtered)
+    :type stage_list: list
+    :param module_index: index of modules shared with the other tools
+        (``None`` for no index), a module is not imported if its members are
+        in the index and its source code file is unchanged, see
+        :class:`.module_tree.ModuleIndex`
+    :type module_index: module_tree.ModuleIndex
+    """
+
+    # get function processing a node
+    expand_function = partial(
+        write_module_node, backend=backend, manifest=manifest,
+        member_cache=member_cache, page_dict=page_dict, flag_all=flag_all,
+        stage_list=stage_list, module_index=module_index
+    )
+
+    # walk package
+    for _ in iter_module_tree(node_list, expand_function, flag_breadth_first):
+        pass
+
+
+def get_indexed_members(module_index, spec, backend="import"):
+    """
+    Gets the members of a module stored in the index of modules
+
+    :param module_index: index of modules
+    :type module_index: module_tree.ModuleIndex
+    :param spec: specification of the module, see :func:`.find_module_spec`
+    :type spec: importlib.machinery.ModuleSpec
+    :param backend: see :func:`.get_module_members`
+    :type backend: str
+
+    :returns: see output of :func:`.get_module_members`, ``None`` if the
+        members are not in the index or if the module is modified
+    :rtype: tuple
+    """
+
+    member_list = module_index.get_value(
+        spec.name, spec.origin, "members_%s" % backend
+    )
+
+    if member_list is None:
+        return None
+
+    return tuple(member_list)
+
+
+def set_indexed_members(module_index, spec, backend, member_tuple):
+    """
+    Stores the members of a module in the index of modules
+
+    :param module_index: index of modules
+    :type module_index: module_tree.ModuleIndex
+    :param spec: specification of the module, see :func:`.find_module_spec`
+    :type spec: importlib.machinery.ModuleSpec
+    :param backend: see :func:`.get_module_members`
+    :type backend: str
+    :param member_tuple: see output of :func:`.get_module_members`
+    :type member_tuple: tuple
+    """
+
+    module_index.set_value(
+        spec.name, spec.origin, "members_%s" % backend,
+        [list(member_list) for member_list in member_tuple]
+    )
+
+
+def get_known_members(
+    spec, source_hash=None, backend="import", member_cache=None,
+    module_index=None
+):
+    """
+    Gets the members of a module in the persistent cache of members, then in
+    the index of modules, so that the module is not imported
+
+    :param spec: specification of the module, see :func:`.find_module_spec`
+    :type spec: importlib.machinery.ModuleSpec
+    :param source_hash: hash of the source code file of the module, see
+        :func:`.get_source_hash` (``None`` if there is no cache)
+    :type source_hash: str
+    :param backend: see :func:`.get_module_members`
+    :type backend: str
+    :param member_cache: see :func:`.generate_index_files_iterative`
+    :type member_cache: MemberCache
+    :param module_index: see :func:`.generate_index_files_iterative`
+    :type module_index: module_tree.ModuleIndex
+
+    :returns: see output of :func:`.get_module_members`, ``None`` if the
+        members are unknown
+    :rtype: tuple
+    """
+
+    # get members of the module in the cache
+    if member_cache is not None:
+        member_tuple = member_cache.get(spec.origin, source_hash, backend)
+        if member_tuple is not None:
+            return member_tuple
+
+    # get members of the module in the index of modules
+    if module_index is not None:
+        return get_indexed_members(module_index, spec, backend)
+
+    return None
+
+
+def set_known_members(
+    spec, source_hash, backend, member_tuple, member_cache=None,
+    module_index=None
+):
+    """
+    Stores the members of a module in the persistent cache of members and in
+    the index of modules, see :func:`.get_known_members`
+
+    :param spec: specification of the module, see :func:`.find_module_spec`
+    :type spec: importlib.machinery.ModuleSpec
+    :param source_hash: see :func:`.get_known_members`
+    :type source_hash: str
+    :param backend: see :func:`.get_module_members`
+    :type backend: str
+    :param member_tuple: see output of :func:`.get_module_members`
+    :type member_tuple: tuple
+    :param member_cache: see :func:`.generate_index_files_iterative`
+    :type member_cache: MemberCache
+    :param module_index: see :func:`.generate_index_files_iterative`
+    :type module_index: module_tree.ModuleIndex
+    """
+
+    if member_cache is not None:
+        member_cache.set(spec.origin, source_hash, backend, member_tuple)
+
+    if module_index is not None:
+        set_indexed_members(module_index, spec, backend, member_tuple)
+
+
+def prepare_module_node(
+    node, manifest=None, member_cache=None, page_dict=None
+):
+    """
+    Creates the directory of the RST index file of a package/module and
+    checks if the file may be kept as is (incremental generation)
+
+    :param node: package/module, its specification is found, see
+        :func:`.find_module_node`
+    :type node: dict
+    :param manifest: see :func:`.generate_index_files_iterative`
+    :type manifest: dict
+    :param member_cache: see :func:`.generate_index_files_iterative`
+    :type member_cache: MemberCache
+    :param page_dict: see :func:`.generate_index_files_iterative`
+    :type page_dict: dict
+
+    :returns: tuple with ``True`` if the RST index file is kept as is (see
+        :func:`.update_manifest`) and the hash of the source code file
+        (``None`` if there is neither manifest nor cache)
+    :rtype: tuple
+    """
+
+    # create index directory
+    if page_dict is None and not isdir(node["out_dir"]):
+        mkdir(node["out_dir"])
+
+    # get source hash
+    if manifest is None and member_cache is None:
+        return False, None
+
+    source_hash = get_source_hash(node["spec"].origin)
+
+    # check if module is unchanged since previous incremental generation
+    flag_unchanged = manifest is not None and update_manifest(
+        manifest, node["spec"], node["out_dir"], source_hash
+    )
+
+    return flag_unchanged, source_hash
+
+
+def write_node_index_file(
+    node, member_tuple=None, manifest=None, page_dict=None
+):
+    """
+    Writes the RST index file of a package/module: its title, then the table
+    of content of a package or the members of a module
+
+    :param node: package/module, its specification and sub-packages/modules
+        are found, see :func:`.find_module_node`
+    :type node: dict
+    :param member_tuple: see output of :func:`.get_module_members`, ``None``
+        for a package or for a module that could not be introspected (the
+        file then only contains its title)
+    :type member_tuple: tuple
+    :param manifest: see :func:`.generate_index_files_iterative`
+    :type manifest: dict
+    :param page_dict: see :func:`.generate_index_files_iterative`
+    :type page_dict: dict
+    """
+
+    # create index file (built in memory)
+    index_path = RSTDocument("%s/index.rst" % node["out_dir"], page_dict)
+    write_section(index_path, node["name"], file_option='w')
+
+    # check if package
+    if node["spec"].submodule_search_locations is not None:
+        write_package_toc_tree(index_path, node["sub_package_list"])
+
+    # module instead
+    elif member_tuple is not None:
+        write_module_members_index(index_path, node["name"], *member_tuple)
+
+    # write index file
+    index_path.flush(flag_if_changed=manifest is not None)
+
+
+def update_manifest(manifest, spec, out_dir, source_hash=None):
+    """
+    Updates the manifest of incremental generation with the source hash of a
+    package/module and checks if its RST index file may be kept as is
+
+    :param manifest: see :func:`.generate_index_files_iterative`
+    :type manifest: dict
+    :param spec: specification of the package/module, see
+        :func:`.find_module_spec`
+    :type spec: importlib.machinery.ModuleSpec
+    :param out_dir: directory of the RST index file of the package/module
+    :type out_dir: str
+    :param source_hash: hash of the source code file of the package/module,
+        computed with :func:`.get_source_hash` if ``None``
+    :type source_hash: str
+
+    :returns: ``True`` if it is a module that is unchanged since the previous
+        generation and its RST index file exists
+    :rtype: bool
+    """
+
+    # get source hash of the package/module
+    if source_hash is None:
+        source_hash = get_source_hash(spec.origin)
+
+    manifest["current"][spec.name] = source_hash
+
+    return spec.submodule_search_locations is None \
+        and manifest["previous"].get(spec.name) == source_hash \
+        and isfile("%s/index.rst" % out_dir)
+
+
+def discover_module_nodes(
+    sub_package_list, package_root_name, out_dir, flag_breadth_first=False,
+    flag_all=False, stage_list=None
+):
+    """
+    Gets the structure of a package without importing it, see
+    :func:`.module_tree.get_module_tree`
+
+    :param sub_package_list: names of the sub-packages/modules to discover
+        inside the package
+    :type sub_package_list: list
+    :param package_root_name: full name of the package
+    :type package_root_name: str
+    :param out_dir: directory where to save the RST index files of the
+        package
+    :type out_dir: str
+    :param flag_breadth_first: see :func:`.iter_module_tree`
+    :type flag_breadth_first: bool
+    :param flag_all: see :func:`.module_tree.get_sub_module_names`
+    :type flag_all: bool
+    :param stage_list: see :func:`.apply_node_stages`, the stages are applied
+        to the sub-packages/modules found during the walk
+        (``sub_package_list`` is not filtered)
+    :type stage_list: list
+
+    :returns: nodes of the sub-packages/modules (see
+        :func:`.make_module_node`), parents before children
+    :rtype: list
+    """
+
+    return list(iter_module_tree(
+        [
+            make_module_node(
+                "%s.%s" % (package_root_name, sub_package_name),
+                "%s/%s" % (out_dir, sub_package_name)
+            ) for sub_package_name in sub_package_list
+        ], partial(find_module_node, flag_all=flag_all, stage_list=stage_list),
+        flag_breadth_first
+    ))
+
+
+def find_module_node(node, flag_all=False, stage_list=None):
+    """
+    Finds the specification and the sub-packages/modules of a node of the
+    work queue of :func:`.iter_module_tree`, in the tree of the package (see
+    :func:`.module_tree.get_module_node`)
+
+    :param node: package/module, see :func:`.make_module_node`
+    :type node: dict
+    :param flag_all: see :func:`.module_tree.get_sub_module_names`
+    :type flag_all: bool
+    :param stage_list: see :func:`.apply_node_stages`
+    :type stage_list: list
+
+    :returns: nodes of the sub-packages/modules (empty for a module)
+    :rtype: list
+    """
+
+    # find package/module in the tree of the package
+    module_node = get_module_node(node["name"], flag_all)
+    node["spec"] = module_node["spec"]
+
+    # check if module
+    if module_node["sub_package_list"] is None:
+        return []
+
+    # get sub-packages/modules
+    child_node_list = apply_node_stages([
+        make_module_node(
+            "%s.%s" % (node["name"], name), "%s/%s" % (node["out_dir"], name)
+        ) for name in module_node["sub_package_list"]
+    ], stage_list)
+    node["sub_package_list"] = [
+        child_node["name"].split('.')[-1] for child_node in child_node_list
+    ]
+
+    return child_node_list
+
+
+def report_worker_pid(pid_queue):
+    """
+    Initializer of the worker processes of :class:`.ImportSandbox`, it
+    reports the process identifier of the worker, so that stuck workers may
+    be terminated
+
+    :param pid_queue: queue shared with the main process
+    :type pid_queue: multiprocessing.SimpleQueue
+    """
+
+    pid_queue.put(getpid())
+
+
+def raise_import_timeout(signal_number, frame):
+    """
+    Handler of the signal ``SIGALRM`` in the worker processes, it interrupts
+    the import of a module exceeding the timeout, see
+    :func:`.introspect_module`
+    """
+
+    raise TimeoutError("import timeout exceeded")
+
+
+def set_memory_limit(memory_limit):
+    """
+    Limits the address space of the current process (Unix only, the limit is
+    ignored on other systems)
+
+    :param memory_limit: maximum size of the address space in megabytes
+    :type memory_limit: int
+    """
+
+    try:
+        import resource
+
+    except ImportError:
+        return
+
+    # the limit may not exceed the hard limit of the process
+    limit = int(memory_limit * 1024 ** 2)
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+    if hard_limit != resource.RLIM_INFINITY:
+        limit = min(limit, hard_limit)
+
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard_limit))
+
+
+def introspect_module(
+    module_full_name, backend="import", package_dir=None, flag_profile=False,
+    timeout=None, memory_limit=None
+):
+    """
+    Gets the members of a module, it is run by the worker processes of
+    :class:`.ImportSandbox`
+
+    :param module_full_name: full name of the module
+    :type module_full_name: str
+    :param backend: see :func:`.load_module`
+    :type backend: str
+    :param package_dir: directory where is stored the package (to be added in
+        the PYTHONPATH of the worker process)
+    :type package_dir: str
+    :param flag_profile: specify if the import and the classification of the
+        members are profiled, see :class:`.GenerationProfiler`
+    :type flag_profile: bool
+    :param timeout: maximum duration in seconds of the import and the
+        introspection, a :class:`TimeoutError` is raised if it is exceeded
+        (Unix only), ``None`` for no timeout
+    :type timeout: float
+    :param memory_limit: maximum size of the address space of the worker
+        process in megabytes (Unix only), ``None`` for no limit
+    :type memory_limit: int
+
+    :returns:
+        - **member_tuple** (*tuple*) -- see output of
+          :func:`.get_module_members`
+        - **event_list** (*list*) -- profiling events, see attribute
+          :attr:`.GenerationProfiler.event_list` (empty if ``flag_profile``
+          is ``False``)
+    """
+
+    if package_dir is not None and abspath(package_dir) not in path:
+        path.insert(0, abspath(package_dir))
+
+    # set profiler of the worker process
+    if flag_profile:
+        profiler = GenerationProfiler()
+    else:
+        profiler = None
+
+    set_profiler(profiler)
+
+    # limit memory of the worker process
+    if memory_limit is not None:
+        set_memory_limit(memory_limit)
+
+    # set timer interrupting the import
+    flag_timer = timeout is not None and hasattr(signal, "setitimer")
+    if flag_timer:
+        signal.signal(signal.SIGALRM, raise_import_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    try:
+        # import module
+        module = load_module(module_full_name, backend=backend)
+        member_tuple = get_module_members(module, backend)
+
+    finally:
+        if flag_timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    if profiler is not None:
+        return member_tuple, profiler.event_list
+
+    return member_tuple, []
+
+
+def generate_index_files_parallel(
+    sub_package_list, package_root_name, out_dir, jobs, backend="import",
+    manifest=None, package_dir=None, member_cache=None, page_dict=None,
+    timeout=None, memory_limit=None, flag_breadth_first=False,
+    flag_all=False, stage_list=None, module_index=None
+):
+    """
+    Writes RST index files of a set of sub-packages/modules of a package and
+    all their sub-packages/modules, the modules are processed concurrently in
+    a pool of processes
+
+    The structure of the package is first discovered without importing it
+    with :func:`.discover_module_nodes`. Then, the modules are imported and
+    introspected in worker processes with :class:`.ImportSandbox` (unless
+    their members are in the cache or in the index of modules), while the
+    RST index files are written by the main process. The RST index file of a
+    module that could not be introspected only contains its title.
+
+    :param sub_package_list: names of the sub-packages/modules to document
+        inside the package
+    :type sub_package_list: list
+    :param package_root_name: full name of the package
+    :type package_root_name: str
+    :param out_dir: directory where to save the RST index files
+    :type out_dir: str
+    :param jobs: number of worker processes
+    :type jobs: int
+    :param backend: see :func:`.load_module`
+    :type backend: str
+    :param manifest: see :func:`.generate_index_files_iterative`
+    :type manifest: dict
+    :param package_dir: see :func:`.introspect_module`
+    :type package_dir: str
+    :param member_cache: see :func:`.generate_index_files_iterative`
+    :type member_cache: MemberCache
+    :param page_dict: see :func:`.generate_index_files_iterative`
+    :type page_dict: dict
+    :param timeout: see :class:`.ImportSandbox`
+    :type timeout: float
+    :param memory_limit: see :class:`.ImportSandbox`
+    :type memory_limit: int
+    :param flag_breadth_first: see :func:`.iter_module_tree`
+    :type flag_breadth_first: bool
+    :param flag_all: see :func:`.module_tree.get_sub_module_names`
+    :type flag_all: bool
+    :param stage_list: see :func:`.discover_module_nodes`
+    :type stage_list: list
+    :param module_index: see :func:`.generate_index_files_iterative`
+    :type module_index: module_tree.ModuleIndex
+
+    :returns: report of the modules that could not be introspected, see
+        attribute :attr:`.ImportSandbox.failure_dict`
+    :rtype: dict
+    """
+
+    # get structure of the package
+    node_list = discover_module_nodes(
+        sub_package_list, package_root_name, out_dir,
+        flag_breadth_first=flag_breadth_first, flag_all=flag_all,
+        stage_list=stage_list
+    )
+
+    # create pool of worker processes
+    sandbox = ImportSandbox(
+        jobs, backend=backend, package_dir=package_dir, timeout=timeout,
+        memory_limit=memory_limit
+    )
+
+    try:
+        # loop on sub-packages/modules
+        for node in node_list:
+            spec = node["spec"]
+
+            # check if module is unchanged since previous incremental
+            # generation
+            flag_unchanged, source_hash = prepare_module_node(
+                node, manifest, member_cache, page_dict
+            )
+            if flag_unchanged:
+                continue
+
+            # initialize members of the module (none for a package)
+            member_tuple = None
+
+            # check if module
+            if spec.submodule_search_locations is None:
+                # get members of the module in the cache or in the index of
+                # modules
+                member_tuple = get_known_members(
+                    spec, source_hash, backend, member_cache, module_index
+                )
+
+                # introspect module in a worker process
+                if member_tuple is None:
+                    sandbox.submit(spec.name, (node, source_hash))
+                    continue
+
+            # write index file
+            write_node_index_file(node, member_tuple, manifest, page_dict)
+
+        # loop on introspected modules
+        for _, (node, source_hash), member_tuple in sandbox.iter_results():
+            # check if module could not be introspected
+            if member_tuple is None:
+                # module is introspected again at next incremental generation
+                if manifest is not None:
+                    manifest["current"][node["name"]] = ''
+
+            # store members in the cache and in the index of modules
+            else:
+                set_known_members(
+                    node["spec"], source_hash, backend, member_tuple,
+                    member_cache, module_index
+                )
+
+            # write index file (title only if not introspected)
+            write_node_index_file(node, member_tuple, manifest, page_dict)
+
+    finally:
+        sandbox.shutdown()
+
+    return sandbox.failure_dict
+
+
+def generate_index_files(
+    package_name, doc_dir, package_dir=None, output_name="APIreference",
+    chapter_title="API reference", flag_include_main=False, backend="import",
+    flag_incremental=False, jobs=1, cache_path=None, cache_max_size=10000,
+    profiler=None, page_dict=None, timeout=None, memory_limit=None,
+    flag_breadth_first=False, flag_all=False, stage_list=None,
+    module_index_path=None
+):
+    """
+    Main function for writing RST index files of a package/module and all
+    sub-packages/modules
+
+    First, it creates the output directory and the RST index file at the first
+    level of the package. Then, it creates the directories corresponding to the
+    package structure and the RST index files thanks to the function
+    :func:`.generate_index_files_iterative`, which walks the package with a
+    work queue.
+
+    :param package_name: name of the package/module
+    :type package_name: str
+    :param doc_dir: directory where is stored the documentation source
+    :type doc_dir: str
+    :param package_dir: directory where is stored the package (to be temporally
+        added in the PYTHONPATH)
+    :type package_dir: str
+    :param output_name: name of the directory to create inside ``doc_dir``,
+        where to store RST index files
+    :type output_name: str
+    :param chapter_title: name of the chapter inside the whole documentation
+    :type chapter_title: str
+    :param flag_include_main: specify if the executable module ``__main__.py``
+        must be included in the documentation
+    :type flag_include_main: bool
+    :param backend: ``"import"`` for getting the members of the modules by
+        importing them, ``"ast"`` for getting them by parsing the source code
+        (no code of the package is executed), see :func:`.load_module`
+    :type backend: str
+    :param flag_incremental: specify if the RST index files of the previous
+        generation are kept and only updated, instead of deleting the output
+        directory and generating all of them. The source hashes of the modules
+        are stored in the file :data:`.MANIFEST_NAME` of the output directory,
+        so that only the RST index files of the modules that changed are
+        generated again. RST index files are written only if their content is
+        changed (so that Sphinx does not read again unchanged pages) and the
+        ones of deleted modules are removed.
+    :type flag_incremental: bool
+    :param jobs: number of processes for importing the modules and rendering
+        their RST index files, if it is greater than 1 the package structure
+        is first discovered without importing it, see
+        :func:`.generate_index_files_parallel`
+    :type jobs: int
+    :param cache_path: path to the file of the persistent cache of the
+        members of the modules (e.g. in the build directory of the
+        documentation), ``None`` for no cache, see :class:`.MemberCache`
+    :type cache_path: str
+    :param cache_max_size: maximum number of entries in the persistent cache
+    :type cache_max_size: int
+    :param profiler: profiler of the generation, ``None`` for no profiling
+    :type profiler: GenerationProfiler
+    :param page_dict: dictionary where the RST index files are stored in
+        memory instead of being written on the disk, ``None`` for writing them
+        on the disk. The key is the path to the RST file (starting with
+        ``doc_dir``), the value is its content. Nothing is written on the disk
+        (the main RST index file of the documentation is not modified), it is
+        not compatible with ``flag_incremental``.
+    :type page_dict: dict
+    :param timeout: maximum duration in seconds of the import of a module,
+        ``None`` for no timeout. If it is not ``None`` (or if
+        ``memory_limit`` is not ``None``), the modules are imported in worker
+        processes even if ``jobs`` is 1, see :class:`.ImportSandbox`
+    :type timeout: float
+    :param memory_limit: maximum size of the address space of the worker
+        processes in megabytes, ``None`` for no limit
+    :type memory_limit: int
+    :param flag_breadth_first: specify if the package is walked breadth first
+        (all packages/modules of a level before the next level), so that the
+        RST index files of the upper levels are written first, see
+        :func:`.iter_module_tree`
+    :type flag_breadth_first: bool
+    :param flag_all: specify if the attribute ``__all__`` of the packages
+        overrides the sub-packages/modules found in their directories (the
+        packages are then imported), see
+        :func:`.module_tree.get_sub_module_names`
+    :type flag_all: bool
+    :param stage_list: functions applied to each sub-package/module before it
+        is documented, e.g. for filtering, see :func:`.apply_node_stages`
+    :type stage_list: list
+    :param module_index_path: path to the JSON file of the index of modules
+        shared with the other tools (e.g. in the build directory of the
+        documentation), ``None`` for no index. The members of the modules
+        are stored in the index, so that a module is not imported again as
+        long as its source code file is unchanged, see
+        :class:`.module_tree.ModuleIndex`
+    :type module_index_path: str
+
+    :returns: report of the modules that could not be imported (only if they
+        are imported in worker processes), key is the module full name, value
+        is the error message
+    :rtype: dict
+    """
+
+    # set profiler
+    previous_profiler = set_profiler(profiler)
+
+    try:
+        if profiler is not None:
+            start = perf_counter()
+
+        failure_dict = generate_index_files_main(
+            package_name, doc_dir, package_dir=package_dir,
+            output_name=output_name, chapter_title=chapter_title,
+            flag_include_main=flag_include_main, backend=backend,
+            flag_incremental=flag_incremental, jobs=jobs,
+            cache_path=cache_path, cache_max_size=cache_max_size,
+            page_dict=page_dict, timeout=timeout, memory_limit=memory_limit,
+            flag_breadth_first=flag_breadth_first, flag_all=flag_all,
+            stage_list=stage_list, module_index_path=module_index_path
+        )
+
+        if profiler is not None:
+            profiler.add_event("total", package_name, start)
+
+    finally:
+        set_profiler(previous_profiler)
+
+    return failure_dict
+
+
+def generate_index_files_main(
+    package_name, doc_dir, package_dir=None, output_name="APIreference",
+    chapter_title="API reference", flag_include_main=False, backend="import",
+    flag_incremental=False, jobs=1, cache_path=None, cache_max_size=10000,
+    page_dict=None, timeout=None, memory_limit=None, flag_breadth_first=False,
+    flag_all=False, stage_list=None, module_index_path=None
+):
+    """
+    Writes RST index files of a package/module and all sub-packages/modules,
+    see :func:`.generate_index_files` for the description of the arguments
+    and of the output (the profiler is set by :func:`.generate_index_files`)
+    """
+
+    if page_dict is not None and flag_incremental:
+        raise ValueError(
+            "Incremental generation is not available for pages in memory"
+        )
+
+    if package_dir is not None:
+        path.insert(0, abspath(package_dir))
+
+    # append API reference to toctree directive in main index file of the
+    # documentation
+    if page_dict is None:
+        append_main_index_file("%s/index.rst" % doc_dir, output_name)
+
+    # get output directory where to store the index files
+    out_dir = "%s/%s" % (doc_dir, output_name)
+
+    # get path to the manifest of incremental generation
+    manifest_path = "%s/%s" % (out_dir, MANIFEST_NAME)
+
+    # check if incremental generation
+    if flag_incremental:
+        manifest = {
+            "previous": load_manifest(manifest_path, backend), "current": {}
+        }
+
+    else:
+        manifest = None
+
+        # delete directory if necessary
+        if page_dict is None and isdir(out_dir):
+            remove_directory(out_dir)
+
+    # create directory
+    if page_dict is None and not isdir(out_dir):
+        mkdir(out_dir)
+
+    # open persistent cache of members
+    if cache_path is not None:
+        member_cache = MemberCache(cache_path, max_size=cache_max_size)
+    else:
+        member_cache = None
+
+    try:
+        # load index of modules (shared in memory with the other tools)
+        if module_index_path is not None:
+            module_index = get_module_index(module_index_path)
+        else:
+            module_index = None
+
+        # create index file (built in memory)
+        index_path = RSTDocument("%s/index.rst" % out_dir, page_dict)
+        write_section(index_path, chapter_title, file_option='w')
+
+        # get structure of the package without importing it (it is kept in
+        # memory for the whole run and shared with summary_groups)
+        sub_package_list = get_module_tree(package_name, flag_all)[
+            package_name
+        ]["sub_package_list"]
+        if sub_package_list is None:
+            sub_package_list = []
+
+        # get modules and sub-packages to document
+        node_list = apply_node_stages([
+            make_module_node(
+                "%s.%s" % (package_name, sub_package_name),
+                "%s/%s" % (out_dir, sub_package_name)
+            ) for sub_package_name in sub_package_list
+            if flag_include_main or sub_package_name != "__main__"
+        ], stage_list)
+        sub_package_list = [node["name"].split('.')[-1] for node in node_list]
+
+        # write toc tree
+        write_package_toc_tree(index_path, sub_package_list)
+
+        # initialize report of modules that could not be imported
+        failure_dict = {}
+
+        # create index files for sub-packages in worker processes
+        if jobs > 1 or timeout is not None or memory_limit is not None:
+            failure_dict = generate_index_files_parallel(
+                sub_package_list, package_name, out_dir, jobs,
+                backend=backend, manifest=manifest, package_dir=package_dir,
+                member_cache=member_cache, page_dict=page_dict,
+                timeout=timeout, memory_limit=memory_limit,
+                flag_breadth_first=flag_breadth_first, flag_all=flag_all,
+                stage_list=stage_list, module_index=module_index
+            )
+
+        else:
+            # create index files for sub-packages
+            generate_index_files_iterative(
+                node_list, backend=backend, manifest=manifest,
+                member_cache=member_cache, page_dict=page_dict,
+                flag_breadth_first=flag_breadth_first, flag_all=flag_all,
+                stage_list=stage_list, module_index=module_index
+            )
+
+    finally:
+        # save persistent cache of members, even if the generation failed
+        if member_cache is not None:
+            member_cache.close()
+
+    # save index of modules
+    if module_index is not None:
+        if _profiler is not None:
+            start = perf_counter()
+
+        nb_byte_written = module_index.save()
+
+        if _profiler is not None and nb_byte_written > 0:
+            _profiler.count_file_open(nb_byte_written)
+            _profiler.add_event("write", module_index.index_path, start)
+
+    # write index file
+    index_path.flush(flag_if_changed=flag_incremental)
+
+    # check if incremental generation
+    if flag_incremental:
+        # remove RST index files of deleted modules
+        remove_stale_pages(out_dir, package_name, manifest["current"])
+
+        # save source hashes of the modules
+        save_manifest(manifest_path, manifest["current"], backend)
+
+    return failure_dict
+
+
+def get_source_hash(source_path):
+    """
+    Gets the hash of a source code file
+
+    :param source_path: path to the source code file, may be ``None`` (e.g.
+        namespace package)
+    :type source_path: str
+
+    :returns: SHA-1 hash of the file content, empty string if ``source_path``
+        is ``None``
+    :rtype: str
+    """
+
+    if source_path is None or not isfile(source_path):
+        return ''
+
+    if _profiler is not None:
+        _profiler.count_file_open()
+
+    with open(source_path, 'rb') as f:
+        return sha1(f.read()).hexdigest()
+
+
+def load_manifest(manifest_path, backend):
+    """
+    Loads the source hashes of the modules stored at the previous incremental
+    generation, see :func:`.save_manifest`
+
+    :param manifest_path: path to the manifest file
+    :type manifest_path: str
+    :param backend: backend used for the current generation, see
+        :func:`.load_module`, the manifest is ignored if it has been saved with
+        another backend
+    :type backend: str
+
+    :returns: key is the full name of a package/module, value is its source
+        hash (see :func:`.get_source_hash`), empty if there is no valid
+        manifest
+    :rtype: dict
+    """
+
+    if not isfile(manifest_path):
+        return {}
+
+    if _profiler is not None:
+        _profiler.count_file_open()
+
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+
+    except ValueError:
+        return {}
+
+    if not isinstance(manifest, dict) or manifest.get("backend") != backend:
+        return {}
+
+    return manifest.get("modules", {})
+
+
+def save_manifest(manifest_path, source_hash_dict, backend):
+    """
+    Saves the source hashes of the modules for the next incremental generation
+
+    :param manifest_path: path to the manifest file
+    :type manifest_path: str
+    :param source_hash_dict: key is the full name of a package/module, value
+        is its source hash (see :func:`.get_source_hash`)
+    :type source_hash_dict: dict
+    :param backend: backend used for the generation, see :func:`.load_module`
+    :type backend: str
+    """
+
+    if _profiler is not None:
+        start = perf_counter()
+
+    content = json.dumps(
+        {"backend": backend, "modules": source_hash_dict}, indent=1,
+        sort_keys=True
+    )
+    with open(manifest_path, 'w') as f:
+        f.write(content)
+
+    if _profiler is not None:
+        _profiler.count_file_open(len(content.encode()))
+        _profiler.add_event("write", manifest_path, start)
+
+
+def iter_directory_files(dir_path):
+    """
+    Walks a directory with :func:`os.scandir` and an explicit stack (instead
+    of :func:`os.walk`, which is recursive), so that the depth of the tree is
+    not limited by the recursion limit, symbolic links to directories are not
+    followed
+
+    :param dir_path: path to the directory
+    :type dir_path: str
+
+    :returns: generator of the paths to the files in the directory and its
+        sub-directories
+    """
+
+    # initialize work queue (directories are popped from its end)
+    dir_list = [dir_path]
+
+    while len(dir_list) > 0:
+        with scandir(dir_list.pop()) as entry_iterator:
+            for entry in entry_iterator:
+                if entry.is_dir(follow_symlinks=False):
+                    dir_list.append(entry.path)
+                else:
+                    yield entry.path
+
+
+def remove_directory(dir_path):
+    """
+    Removes a directory and its content with :func:`os.scandir` and an
+    explicit stack (instead of :func:`shutil.rmtree`, which is recursive), so
+    that the depth of the tree is not limited by the recursion limit,
+    symbolic links are removed but not followed
+
+    :param dir_path: path to the directory
+    :type dir_path: str
+    """
+
+    # initialize work queue (directories are popped from its end) and list of
+    # directories to remove once empty (parents before children)
+    dir_list = [dir_path]
+    empty_dir_list = []
+
+    while len(dir_list) > 0:
+        sub_dir_path = dir_list.pop()
+        empty_dir_list.append(sub_dir_path)
+
+        # remove files and push sub-directories
+        with scandir(sub_dir_path) as entry_iterator:
+            for entry in entry_iterator:
+                if entry.is_dir(follow_symlinks=False):
+                    dir_list.append(entry.path)
+                else:
+                    remove(entry.path)
+
+    # remove directories, children before parents
+    for sub_dir_path in reversed(empty_dir_list):
+        rmdir(sub_dir_path)
+
+
+def remove_stale_pages(out_dir, package_name, source_hash_dict):
+    """
+    Removes the directories of the RST index files that do not correspond to a
+    documented package/module (e.g. deleted module)
+
+    :param out_dir: directory where are stored the RST index files
+    :type out_dir: str
+    :param package_name: name of the documented package
+    :type package_name: str
+    :param source_hash_dict: key is the full name of a documented
+        package/module (see :func:`.save_manifest`)
+    :type source_hash_dict: dict
+    """
+
+    # get relative path of the directories of documented packages/modules
+    page_dir_set = set([
+        module_full_name[len(package_name) + 1:].replace('.', '/')
+        for module_full_name in source_hash_dict.keys()
+    ])
+
+    # initialize work queue with the relative path of the directories to walk
+    # (only the directories of documented packages/modules are walked)
+    dir_list = ['']
+
+    while len(dir_list) > 0:
+        dir_relative_path = dir_list.pop()
+
+        # loop on sub-directories
+        with scandir("%s/%s" % (out_dir, dir_relative_path)) as entry_iterator:
+            entry_list = [
+                entry for entry in entry_iterator
+                if entry.is_dir(follow_symlinks=False)
+            ]
+
+        for entry in entry_list:
+            sub_dir_relative_path = ("%s/%s" % (
+                dir_relative_path, entry.name
+            )).lstrip('/')
+
+            if sub_dir_relative_path in page_dir_set:
+                dir_list.append(sub_dir_relative_path)
+            else:
+                remove_directory(entry.path)
+
+
+def get_package_fingerprint(package_name):
+    """
+    Gets a fingerprint of the source code of a package, based on the path,
+    modification time and size of its Python files (files are not read and
+    the package is not imported)
+
+    :param package_name: name of the package/module
+    :type package_name: str
+
+    :returns: SHA-1 hash of the file properties
+    :rtype: str
+    """
+
+    # find package
+    spec = find_module_spec(package_name)
+
+    # get list of Python files
+    if spec.submodule_search_locations is None:
+        file_path_list = [spec.origin]
+
+    else:
+        file_path_list = []
+        for dir_path in spec.submodule_search_locations:
+            file_path_list += [
+                file_path for file_path in iter_directory_files(dir_path)
+                if file_path.endswith(".py")
+            ]
+
+    # get file properties
+    fingerprint = sha1()
+    for file_path in sorted(file_path_list):
+        file_stat = stat(file_path)
+        fingerprint.update(("%s %d %d\n" % (
+            file_path, file_stat.st_mtime_ns, file_stat.st_size
+        )).encode())
+
+    return fingerprint.hexdigest()
+
+
+def generate_api_reference(app):
+    """
+    Generates the API reference at the beginning of a Sphinx build, it is
+    connected to the Sphinx event ``builder-inited`` by :func:`.setup`
+
+    The RST index files are generated in the Sphinx source directory with
+    :func:`.generate_index_files` in incremental mode, so that only the pages
+    of changed modules are written. The members of the modules are stored in
+    the index of modules :data:`.module_tree.MODULE_INDEX_NAME` of the
+    doctree directory (shared with :mod:`.summary_groups`), so that unchanged
+    modules are not imported again even if the Sphinx environment is reset.
+    The generation is skipped if the fingerprint of the package source code
+    (see :func:`.get_package_fingerprint`) is the same as the one stored in
+    the Sphinx environment at the previous build.
+
+    If the configuration value ``auto_doc_api_flag_virtual`` is ``True``, the
+    RST index files are generated in memory and stored in the Sphinx
+    environment instead, see :func:`.register_virtual_pages`.
+
+    :param app: Sphinx application
+    """
+
+    from sphinx import version_info as sphinx_version_info
+    from sphinx.util import logging
+
+    logger = logging.getLogger(__name__)
+
+    # initialize pages in memory to read again
+    app.env.auto_doc_api_outdated_set = set()
+
+    # get package to document
+    package_name = app.config.auto_doc_api_package
+    if not package_name:
+        return
+
+    # add package directory in the PYTHONPATH
+    package_dir = app.config.auto_doc_api_package_dir
+    if package_dir is not None:
+        package_dir = abspath("%s/%s" % (app.confdir, package_dir))
+        if package_dir not in path:
+            path.insert(0, package_dir)
+
+    # get output directory
+    doc_dir = str(app.srcdir)
+    output_name = app.config.auto_doc_api_output_name
+
+    # check if pages in memory (documents of the Sphinx project are mapped to
+    # their source file by a private dictionary, see
+    # VIRTUAL_PAGE_SPHINX_RANGE)
+    flag_virtual = app.config.auto_doc_api_flag_virtual
+    if flag_virtual and not VIRTUAL_PAGE_SPHINX_RANGE[0] \
+            <= tuple(sphinx_version_info[:2]) < VIRTUAL_PAGE_SPHINX_RANGE[1]:
+        logger.warning(
+            "[auto_doc_api] pages in memory not supported by Sphinx %s, API "
+            "reference written in %s" % (
+                '.'.join(str(number) for number in sphinx_version_info[:3]),
+                output_name
+            )
+        )
+        flag_virtual = False
+
+    elif flag_virtual and not isinstance(
+        getattr(app.project, "_docname_to_path", None), dict
+    ):
+        logger.warning(
+            "[auto_doc_api] pages in memory not supported, the Sphinx project "
+            "has no dictionary _docname_to_path, API reference written in %s"
+            % output_name
+        )
+        flag_virtual = False
+
+    # check if API reference is already generated
+    if flag_virtual:
+        flag_generated = getattr(app.env, "auto_doc_api_page_dict", None) \
+            is not None
+    else:
+        flag_generated = isdir("%s/%s" % (doc_dir, output_name))
+
+    # check if package is unchanged since previous build
+    fingerprint = get_package_fingerprint(package_name)
+    if getattr(app.env, "auto_doc_api_fingerprint", None) == fingerprint \
+            and flag_generated:
+        logger.info("[auto_doc_api] %s unchanged, API reference kept" % (
+            package_name
+        ))
+        return
+
+    logger.info("[auto_doc_api] generating API reference of %s" % (
+        package_name
+    ))
+
+    # generate API reference
+    if flag_virtual:
+        page_dict = {}
+    else:
+        page_dict = None
+
+    failure_dict = generate_index_files(
+        package_name, doc_dir, output_name=output_name,
+        chapter_title=app.config.auto_doc_api_chapter_title,
+        flag_include_main=app.config.auto_doc_api_flag_include_main,
+        backend=app.config.auto_doc_api_backend,
+        flag_incremental=not flag_virtual, jobs=app.config.auto_doc_api_jobs,
+        cache_path=app.config.auto_doc_api_cache_path, page_dict=page_dict,
+        timeout=app.config.auto_doc_api_timeout,
+        memory_limit=app.config.auto_doc_api_memory_limit,
+        flag_all=app.config.auto_doc_api_flag_all,
+        module_index_path="%s/%s" % (app.doctreedir, MODULE_INDEX_NAME)
+    )
+
+    # report modules that could not be imported
+    for module_full_name, message in sorted(failure_dict.items()):
+        logger.warning("[auto_doc_api] %s not documented: %s" % (
+            module_full_name, message
+        ))
+
+    # store pages in the Sphinx environment, key is the document name
+    if flag_virtual:
+        previous_page_dict = getattr(app.env, "auto_doc_api_page_dict", None)
+        if previous_page_dict is None:
+            previous_page_dict = {}
+
+        app.env.auto_doc_api_page_dict = {}
+        for index_path, content in page_dict.items():
+            docname = relpath(index_path, doc_dir).replace('\\', '/')[:-4]
+            app.env.auto_doc_api_page_dict[docname] = content
+
+            # check if page changed since previous build
+            if previous_page_dict.get(docname) != content:
+                app.env.auto_doc_api_outdated_set.add(docname)
+
+    else:
+        app.env.auto_doc_api_page_dict = None
+
+    # store fingerprint in the Sphinx environment
+    app.env.auto_doc_api_fingerprint = fingerprint
+
+
+def get_virtual_page_path(app):
+    """
+    Gets the path to the empty source file shared by the pages in memory of
+    the API reference, see :func:`.register_virtual_pages`
+
+    :param app: Sphinx application
+
+    :returns: absolute path to the file :data:`.VIRTUAL_PAGE_NAME` in the
+        doctree directory
+    :rtype: str
+    """
+
+    return abspath("%s/%s" % (app.doctreedir, VIRTUAL_PAGE_NAME))
+
+
+def exclude_virtual_page(app, config):
+    """
+    Adds the empty source file of the pages in memory to the configuration
+    value ``exclude_patterns`` if the doctree directory is inside the Sphinx
+    source directory (e.g. **_build/doctrees** without ``exclude_patterns``),
+    so that Sphinx does not find it as a document, it is connected to the
+    Sphinx event ``config-inited`` by :func:`.setup`
+
+    The configuration is changed before Sphinx compares it with the one of
+    the previous build, so that the environment is not reset.
+
+    :param app: Sphinx application
+    :param config: Sphinx configuration
+    """
+
+    if not config.auto_doc_api_flag_virtual:
+        return
+
+    # check if source file inside source directory
+    virtual_page_path = get_virtual_page_path(app)
+    src_dir = abspath(str(app.srcdir))
+    if not virtual_page_path.startswith(src_dir + sep):
+        return
+
+    pattern = relpath(virtual_page_path, src_dir).replace('\\', '/')
+    if pattern not in config.exclude_patterns:
+        config.exclude_patterns = list(config.exclude_patterns) + [pattern]
+
+
+def hide_virtual_pages(app):
+    """
+    Removes the pages in memory of the previous build from the documents of
+    the Sphinx project at the beginning of a build, so that the extensions
+    walking the source files of the documents (e.g. autosummary) do not read
+    the empty file of the pages, it is connected to the Sphinx event
+    ``builder-inited`` by :func:`.setup`, before the other extensions
+
+    The pages are added again once the documents are found by Sphinx, see
+    :func:`.register_virtual_pages`.
+
+    :param app: Sphinx application
+    """
+
+    page_dict = getattr(app.env, "auto_doc_api_page_dict", None)
+    if page_dict is not None:
+        app.env.project.docnames.difference_update(page_dict.keys())
+
+
+def register_virtual_pages(app, env, added, changed, removed):
+    """
+    Adds the pages in memory of the API reference to the documents of the
+    Sphinx project, it is connected to the Sphinx event ``env-get-outdated``
+    by :func:`.setup`
+
+    Sphinx reads the source file of each document, so all the pages in memory
+    are mapped to the same empty file :data:`.VIRTUAL_PAGE_NAME` in the
+    doctree directory, and its content is replaced by the one of the page
+    when it is read (see :func:`.read_virtual_page`).
+
+    The pages are added to the private dictionary ``_docname_to_path`` of the
+    Sphinx project (there is no public API for documents without their own
+    source file), so this mode is only enabled for the versions of Sphinx in
+    :data:`.VIRTUAL_PAGE_SPHINX_RANGE`, see :func:`.generate_api_reference`.
+    The empty file is excluded from the documents found by Sphinx, see
+    :func:`.exclude_virtual_page`.
+
+    :param app: Sphinx application
+    :param env: Sphinx environment
+    :param added: names of the added documents
+    :type added: set
+    :param changed: names of the changed documents
+    :type changed: set
+    :param removed: names of the removed documents
+    :type removed: set
+
+    :returns: names of the pages that changed since the previous build
+    :rtype: list
+    """
+
+    from pathlib import Path
+    from sphinx.util import logging
+
+    page_dict = getattr(env, "auto_doc_api_page_dict", None)
+    if page_dict is None:
+        return []
+
+    # check private mapping of the documents to their source file
+    if not isinstance(getattr(env.project, "_docname_to_path", None), dict):
+        logging.getLogger(__name__).warning(
+            "[auto_doc_api] pages in memory not supported, the Sphinx project "
+            "has no dictionary _docname_to_path, pages not added"
+        )
+        return []
+
+    # create empty source file of the pages
+    virtual_page_path = get_virtual_page_path(app)
+    if not isfile(virtual_page_path):
+        makedirs(str(app.doctreedir), exist_ok=True)
+        open(virtual_page_path, 'w').close()
+
+    # loop on pages (when the configuration changed, added is the set of
+    # documents of the project, so pages are added to it as well)
+    for docname in page_dict.keys():
+        env.project.docnames.add(docname)
+        env.project._docname_to_path[docname] = Path(virtual_page_path)
+
+        removed.discard(docname)
+        if docname not in env.all_docs:
+            added.add(docname)
+
+    return sorted(env.auto_doc_api_outdated_set & set(env.all_docs.keys()))
+
+
+def read_virtual_page(app, docname, source):
+    """
+    Gets the content of a page in memory of the API reference when Sphinx
+    reads it, it is connected to the Sphinx event ``source-read`` by
+    :func:`.setup`
+
+    :param app: Sphinx application
+    :param docname: name of the document
+    :type docname: str
+    :param source: list with one element, the content of the document
+    :type source: list
+    """
+
+    page_dict = getattr(app.env, "auto_doc_api_page_dict", None)
+    if page_dict is not None and docname in page_dict:
+        source[0] = page_dict[docname]
+
+
+def setup(app):
+    """
+    Sets up the Sphinx extension, so that the API reference is generated at
+    the beginning of each Sphinx build (see :func:`.generate_api_reference`)
+    instead of launching this script beforehand
+
+    The following configuration values are available in **conf.py** (see
+    :func:`.generate_index_files` for details):
+
+    - ``auto_doc_api_package``: name of the package to document (required),
+    - ``auto_doc_api_package_dir``: directory containing the package,
+      relative to the directory of **conf.py**, default ``None``,
+    - ``auto_doc_api_output_name``: default ``"APIreference"``,
+    - ``auto_doc_api_chapter_title``: default ``"API reference"``,
+    - ``auto_doc_api_flag_include_main``: default ``False``,
+    - ``auto_doc_api_backend``: default ``"import"``,
+    - ``auto_doc_api_jobs``: default ``1``,
+    - ``auto_doc_api_cache_path``: default ``None``,
+    - ``auto_doc_api_timeout``: default ``None``,
+    - ``auto_doc_api_memory_limit``: default ``None``,
+    - ``auto_doc_api_flag_all``: default ``False``,
+    - ``auto_doc_api_flag_virtual``: specify if the pages are kept in memory
+      instead of being written in the source directory, default ``False``
+      (then ``"<output_name>/index"`` must be in the toctree of the main
+      index file of the documentation).
+
+    :param app: Sphinx application
+
+    :returns: extension metadata
+    :rtype: dict
+    """
+
+    app.add_config_value("auto_doc_api_package", None, "env")
+    app.add_config_value("auto_doc_api_package_dir", None, "env")
+    app.add_config_value("auto_doc_api_output_name", "APIreference", "env")
+    app.add_config_value("auto_doc_api_chapter_title", "API reference", "env")
+    app.add_config_value("auto_doc_api_flag_include_main", False, "env")
+    app.add_config_value("auto_doc_api_backend", "import", "env")
+    app.add_config_value("auto_doc_api_jobs", 1, '')
+    app.add_config_value("auto_doc_api_cache_path", None, '')
+    app.add_config_value("auto_doc_api_timeout", None, '')
+    app.add_config_value("auto_doc_api_memory_limit", None, '')
+    app.add_config_value("auto_doc_api_flag_all", False, "env")
+    app.add_config_value("auto_doc_api_flag_virtual", False, "env")
+
+    app.connect("config-inited", exclude_virtual_page)
+    app.connect("builder-inited", hide_virtual_pages, priority=100)
+    app.connect("builder-inited", generate_api_reference)
+    app.connect("env-get-outdated", register_virtual_pages)
+    app.connect("source-read", read_virtual_page)
+
+    return {"parallel_read_safe": True, "parallel_write_safe": True}
+
+
+def append_main_index_file(main_index_path, api_ref_name):
+    """
+    Appends main RST index file of the documentation (which contains the
+    doctree of the whole documentation) with the main RST index file of the
+    API reference
+
+    :param main_index_path: path to the main RST index file of the
+        documentation
+    :type main_index_path: str
+    :param api_ref_name: name of the directory containing the RST index files
+        of the API reference
+    :type api_ref_name: str
+    """
+
+    with open(main_index_path, 'r') as f:
+        content_list = f.readlines()
+        if "   %s/index\n" % api_ref_name not in content_list:
+            start_ind = content_list.index(".. toctree::\n") + 1
+            for i, content in enumerate(content_list[start_ind:]):
+                if len(content) > 3 and content[:3] != '   ' or \
+                        len(content) < 3:
+                    break
+
+            end_ind = start_ind + i
+            if end_ind == len(content_list) - 1:
+                if content_list[-1][-1:] != '\n':
+                    content_list[-1] += '\n'
+                end_ind += 1
+
+            content_list.insert(end_ind, "   %s/index\n" % api_ref_name)
+
+        else:
+            # main index file is unchanged, so it is not written again
+            return
+
+    with open(main_index_path, 'w') as f:
+        f.writelines(content_list)
 
 
 if __name__ == "__main__":
@@ -628,6 +3341,111 @@ if __name__ == "__main__":
         default=0
     )
 
+    parser.add_argument(
+        "--backend",
+        "-b",
+        type=str,
+        choices=["import", "ast"],
+        help="how to get the members of the modules, 'import' (modules are "
+        "imported) or 'ast' (source code is parsed, no code is executed), "
+        "default 'import'",
+        default=None
+    )
+
+    parser.add_argument(
+        "--flag_incremental",
+        "-n",
+        action="store_true",
+        help="specify if the RST index files of the previous generation are "
+        "only updated with respect to the changes in the package, instead of "
+        "being all generated again"
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        help="number of processes for importing the modules and writing "
+        "their RST index files in parallel, default 1",
+        default=None
+    )
+
+    parser.add_argument(
+        "--profile",
+        "-p",
+        action="store_true",
+        help="specify if the duration of each step of the generation (import, "
+        "classification of members, rendering, writing) is measured for each "
+        "module, a summary is printed at the end"
+    )
+
+    parser.add_argument(
+        "--profile_path",
+        type=str,
+        help="path to the JSON file (Chrome trace event format) where to "
+        "write the profiling events, it enables profiling, default None",
+        default=None
+    )
+
+    parser.add_argument(
+        "--cache_path",
+        "-c",
+        type=str,
+        help="path to the file where the members of the modules are cached "
+        "between runs (e.g. in the documentation build directory), so that "
+        "unchanged modules are not imported again, default None",
+        default=None
+    )
+
+    parser.add_argument(
+        "--module_index_path",
+        type=str,
+        help="path to the JSON file of the index of modules shared with "
+        "summary_groups (e.g. module_tree_index.json in the doctree "
+        "directory), so that unchanged modules are not imported again, "
+        "default None",
+        default=None
+    )
+
+    parser.add_argument(
+        "--flag_breadth_first",
+        action="store_true",
+        help="specify if the package is walked breadth first, so that the "
+        "RST index files of the upper levels are written first"
+    )
+
+    parser.add_argument(
+        "--flag_all",
+        action="store_true",
+        help="specify if the attribute __all__ of the packages (which are "
+        "then imported) overrides the sub-packages and modules found in their "
+        "directories"
+    )
+
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="maximum duration in seconds of the import of a module, the "
+        "modules are then imported in worker processes and the ones exceeding "
+        "the timeout are not documented, default None",
+        default=None
+    )
+
+    parser.add_argument(
+        "--memory_limit",
+        type=int,
+        help="maximum memory in megabytes of the worker processes where the "
+        "modules are imported, default None",
+        default=None
+    )
+
+    parser.add_argument(
+        "--report_path",
+        type=str,
+        help="path to the JSON file where to write the modules that could not "
+        "be imported in worker processes, default None",
+        default=None
+    )
 
     # get namespace
     args, _ = parser.parse_known_args()
@@ -642,6 +3460,20 @@ if __name__ == "__main__":
     doc_dir = kwargs["doc_dir"]
     del kwargs["doc_dir"]
 
+    # get profiling arguments
+    flag_profile = kwargs["profile"]
+    del kwargs["profile"]
+
+    profile_path = kwargs["profile_path"]
+    del kwargs["profile_path"]
+
+    # get path to the report of failures
+    report_path = kwargs["report_path"]
+    del kwargs["report_path"]
+
+    if flag_profile or profile_path is not None:
+        kwargs["profiler"] = GenerationProfiler()
+
     # remove keyword arguments equal to None
     # => keep default values of the function
     key_list = list(kwargs.keys())
@@ -656,4 +3488,19 @@ if __name__ == "__main__":
     # launch autodoc API #
     ######################
 
-    generate_index_files(package_name, doc_dir, **kwargs)
+    failure_dict = generate_index_files(package_name, doc_dir, **kwargs)
+
+    # print and write modules that could not be imported
+    for module_full_name, message in sorted(failure_dict.items()):
+        print("%s not documented: %s" % (module_full_name, message))
+
+    if report_path is not None:
+        with open(report_path, 'w') as f:
+            json.dump(failure_dict, f, indent=1, sort_keys=True)
+
+    # print and write profiling
+    if "profiler" in kwargs:
+        kwargs["profiler"].print_summary()
+
+        if profile_path is not None:
+            kwargs["profiler"].write_trace(profile_path)
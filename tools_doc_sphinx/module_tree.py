@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright Université Rennes 1 / INSERM
+# Contributor: Raphael Weber
+#
+# Under CeCILL license
+# http://www.cecill.info
+
+"""
+Module for discovering the structure of a package (sub-packages and modules)
+without importing it, shared by :mod:`.auto_doc_api` and
+:mod:`.summary_groups`
+
+The sub-packages/modules of a package are found by scanning the directories
+of its ``__path__`` with :func:`pkgutil.iter_modules`, so that namespace
+packages and packages without ``__all__`` are supported. The discovered tree
+is cached, so that it is walked once per run by all the tools.
+
+The information extracted from the modules by the tools (members, groups of
+methods) may be stored in a :class:`.ModuleIndex`, which is saved in the
+Sphinx build directory and reused as long as the source code files are
+unchanged.
+"""
+
+from importlib import import_module
+from importlib.machinery import PathFinder
+from importlib.util import find_spec
+from pkgutil import iter_modules
+from sys import version
+from hashlib import sha1
+from os import stat, makedirs, replace, getpid
+from os.path import dirname, abspath
+import json
+
+
+#: (*str*) Name of the file where the index of the modules is saved, inside
+#: the Sphinx build directory (doctree directory), see :class:`.ModuleIndex`
+MODULE_INDEX_NAME = "module_tree_index.json"
+
+
+#: (*dict*) Trees of packages already discovered, key is a tuple with the
+#: package name and ``flag_all`` (see :func:`.get_module_tree`), value is a
+#: tuple with the tree and the modification times of the directories of the
+#: packages
+_module_tree_cache = {}
+
+#: (*dict*) Indexes of modules already loaded, key is the path to the index
+#: file, value is the :class:`.ModuleIndex`
+_module_index_cache = {}
+
+
+class ModuleIndex():
+    """
+    Serializable index of the modules of documented packages, shared by the
+    tools of this package (in memory with :func:`.get_module_index` and
+    between runs in a JSON file), so that information extracted from a
+    module is not extracted again as long as its source code file is
+    unchanged
+
+    Each entry of the index corresponds to a package/module, identified by
+    its full name, and contains the path to its source code file, the
+    modification time and size of the file, the hash of its content and the
+    values stored by the tools, e.g. ``"members_import"`` for the members
+    found by :mod:`.auto_doc_api` (with the backend ``"import"``) and
+    ``"groups"`` for the groups of methods found by :mod:`.summary_groups`.
+    The values of an entry are removed when the content of the file is
+    modified (a file whose modification time or size changed is read again
+    and its values are kept if the hash of its content is unchanged, e.g.
+    file touched).
+
+    :param index_path: path to the JSON file of the index (loaded if it
+        exists), ``None`` for an index in memory only
+    :type index_path: str
+    """
+
+    def __init__(self, index_path=None):
+        #: (*str*) Path to the JSON file of the index
+        self.index_path = index_path
+
+        #: (*dict*) Entries of the index, key is the full name of the
+        #: package/module, value is a dictionary with keys ``"path"``,
+        #: ``"stamp"`` (modification time in nanoseconds and size of the
+        #: file), ``"hash"`` (SHA-1 hash of the file content) and the stored
+        #: values
+        self.module_dict = {}
+
+        #: (*bool*) Specify if the index is changed since it has been loaded
+        self.flag_changed = False
+
+        # load index (ignored if saved by another Python interpreter)
+        if index_path is not None:
+            try:
+                with open(index_path, 'r') as f:
+                    content = json.load(f)
+
+                if content.get("interpreter") == version:
+                    self.module_dict = content["modules"]
+
+            except (OSError, ValueError, KeyError, AttributeError):
+                pass
+
+    def get_entry(self, module_full_name, module_path):
+        """
+        Gets the entry of a package/module, it is emptied if the content of
+        its source code file is modified since the values were stored
+
+        :param module_full_name: full name of the package/module
+        :type module_full_name: str
+        :param module_path: path to its source code file, may be ``None``
+            (e.g. namespace package)
+        :type module_path: str
+
+        :returns: entry of the package/module
+        :rtype: dict
+        """
+
+        # get modification time and size of the file
+        if module_path is None:
+            stamp = None
+
+        else:
+            module_path = abspath(module_path)
+            try:
+                file_stat = stat(module_path)
+                stamp = [file_stat.st_mtime_ns, file_stat.st_size]
+
+            except OSError:
+                stamp = None
+
+        # check if entry is up to date
+        entry = self.module_dict.get(module_full_name)
+        if entry is not None and entry["path"] == module_path \
+                and entry["stamp"] == stamp:
+            return entry
+
+        # get hash of the file content
+        if stamp is None:
+            source_hash = None
+
+        else:
+            with open(module_path, 'rb') as f:
+                source_hash = sha1(f.read()).hexdigest()
+
+        # check if content unchanged (e.g. file touched), reset entry otherwise
+        if entry is not None and entry["path"] == module_path \
+                and source_hash is not None \
+                and entry.get("hash") == source_hash:
+            entry["stamp"] = stamp
+
+        else:
+            entry = {"path": module_path, "stamp": stamp, "hash": source_hash}
+            self.module_dict[module_full_name] = entry
+
+        self.flag_changed = True
+
+        return entry
+
+    def get_value(self, module_full_name, module_path, key):
+        """
+        Gets a value stored in the entry of a package/module
+
+        :param module_full_name: full name of the package/module
+        :type module_full_name: str
+        :param module_path: see :meth:`.get_entry`
+        :type module_path: str
+        :param key: name of the value
+        :type key: str
+
+        :returns: stored value, ``None`` if it is not stored or if the source
+            code file is modified
+        """
+
+        return self.get_entry(module_full_name, module_path).get(key)
+
+    def set_value(self, module_full_name, module_path, key, value):
+        """
+        Stores a value in the entry of a package/module
+
+        :param module_full_name: full name of the package/module
+        :type module_full_name: str
+        :param module_path: see :meth:`.get_entry`
+        :type module_path: str
+        :param key: name of the value
+        :type key: str
+        :param value: value to store, it must be serializable in JSON
+        """
+
+        self.get_entry(module_full_name, module_path)[key] = value
+        self.flag_changed = True
+
+    def save(self):
+        """
+        Saves the index in its JSON file if it is changed, the entries of the
+        packages/modules whose source code file does not exist anymore are
+        removed
+
+        :returns: number of bytes written in the file (``0`` if the index is
+            not saved), e.g. for profiling
+        :rtype: int
+        """
+
+        if self.index_path is None or not self.flag_changed:
+            return 0
+
+        # remove entries of deleted files
+        for module_full_name, entry in list(self.module_dict.items()):
+            if entry["stamp"] is not None:
+                try:
+                    stat(entry["path"])
+
+                except OSError:
+                    del self.module_dict[module_full_name]
+
+        # write index in a temporary file which then replaces the index file,
+        # so that the index is never read partially written
+        makedirs(dirname(abspath(self.index_path)), exist_ok=True)
+        tmp_path = "%s.%d.tmp" % (self.index_path, getpid())
+        content = json.dumps(
+            {"interpreter": version, "modules": self.module_dict}
+        )
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+
+        replace(tmp_path, self.index_path)
+
+        self.flag_changed = False
+
+        return len(content.encode())
+
+
+def find_module_spec(module_full_name):
+    """
+    Finds the specification of a module without importing it (nor its parent
+    packages)
+
+    The top-level package is found with :func:`importlib.util.find_spec`, so
+    that all the finders of :data:`sys.meta_path` are used (e.g. editable
+    installs), which does not import anything for a top-level name. The
+    sub-packages/modules are then found with
+    :class:`importlib.machinery.PathFinder` in the directories of their
+    parent package.
+
+    :param module_full_name: full name of the module
+    :type module_full_name: str
+
+    :returns: specification of the module
+    :rtype: importlib.machinery.ModuleSpec
+    """
+
+    name_list = module_full_name.split('.')
+
+    # find top-level package
+    try:
+        spec = find_spec(name_list[0])
+
+    except ValueError:
+        spec = None
+
+    # find sub-packages/modules in the directories of their parent
+    for i in range(1, len(name_list)):
+        if spec is None:
+            break
+
+        if spec.submodule_search_locations is None:
+            spec = None
+        else:
+            spec = PathFinder.find_spec(
+                '.'.join(name_list[:i + 1]), spec.submodule_search_locations
+            )
+
+    if spec is None:
+        raise ModuleNotFoundError(
+            "No module named '%s'" % module_full_name, name=module_full_name
+        )
+
+    return spec
+
+
+def get_sub_module_names(spec, flag_all=False):
+    """
+    Gets the names of the sub-packages/modules of a package
+
+    :param spec: specification of the package, see :func:`.find_module_spec`
+    :type spec: importlib.machinery.ModuleSpec
+    :param flag_all: specify if the attribute ``__all__`` of the package
+        (which is then imported) overrides the sub-packages/modules found in
+        its directories, only the names of ``__all__`` that are
+        sub-packages/modules are kept, in the order of ``__all__``
+    :type flag_all: bool
+
+    :returns: names of the sub-packages/modules
+    :rtype: list
+    """
+
+    # scan directories of the package
+    name_list = [
+        name for _, name, _ in iter_modules(spec.submodule_search_locations)
+    ]
+
+    # check if __all__ overrides sub-packages/modules
+    if flag_all:
+        all_list = getattr(import_module(spec.name), "__all__", None)
+        if all_list is not None:
+            name_list = [name for name in all_list if name in name_list]
+
+    return name_list
+
+
+def discover_module_tree(package_name, flag_all=False):
+    """
+    Discovers the tree of sub-packages/modules of a package, without
+    importing it (unless ``flag_all`` is ``True``), the package is walked
+    depth first with a work queue
+
+    :param package_name: full name of the package/module
+    :type package_name: str
+    :param flag_all: see :func:`.get_sub_module_names`
+    :type flag_all: bool
+
+    :returns: key is the full name of a package/module (parents before
+        children, depth first), value is a dictionary with the following
+        keys:
+
+        - ``"spec"``: specification of the package/module, see
+          :func:`.find_module_spec`,
+        - ``"sub_package_list"``: names of its sub-packages/modules, ``None``
+          if it is a module.
+    :rtype: dict
+    """
+
+    # initialize output
+    module_tree = {}
+
+    # initialize work queue (nodes are popped from its end)
+    spec_list = [find_module_spec(package_name)]
+
+    while len(spec_list) > 0:
+        spec = spec_list.pop()
+        module_tree[spec.name] = {"spec": spec, "sub_package_list": None}
+
+        # check if package
+        if spec.submodule_search_locations is not None:
+            sub_package_list = get_sub_module_names(spec, flag_all)
+            module_tree[spec.name]["sub_package_list"] = sub_package_list
+
+            # find sub-packages/modules in the directories of the package
+            for name in reversed(sub_package_list):
+                spec_list.append(PathFinder.find_spec(
+                    "%s.%s" % (spec.name, name),
+                    spec.submodule_search_locations
+                ))
+
+    return module_tree
+
+
+def get_directory_times(module_tree):
+    """
+    Gets the modification times of the directories and of the files
+    ``__init__.py`` of the packages of a tree, which change when a
+    sub-package/module is added or removed
+
+    :param module_tree: see output of :func:`.discover_module_tree`
+    :type module_tree: dict
+
+    :returns: list of tuples with the path and the modification time in
+        nanoseconds (``None`` if the path does not exist anymore)
+    :rtype: list
+    """
+
+    # initialize output
+    time_list = []
+
+    # loop on packages
+    for node in module_tree.values():
+        spec = node["spec"]
+        if spec.submodule_search_locations is None:
+            continue
+
+        path_list = list(spec.submodule_search_locations)
+        if spec.origin is not None and spec.has_location:
+            path_list.append(spec.origin)
+
+        for path in path_list:
+            try:
+                time_list.append((path, stat(path).st_mtime_ns))
+
+            except OSError:
+                time_list.append((path, None))
+
+    return time_list
+
+
+def get_module_tree(package_name, flag_all=False):
+    """
+    Gets the tree of sub-packages/modules of a package, it is discovered with
+    :func:`.discover_module_tree` at the first call and then kept in memory
+    as long as the directories of the packages are unchanged (no
+    sub-package/module added or removed), see :func:`.get_directory_times`
+
+    :param package_name: full name of the package/module
+    :type package_name: str
+    :param flag_all: see :func:`.get_sub_module_names`
+    :type flag_all: bool
+
+    :returns: see output of :func:`.discover_module_tree`
+    :rtype: dict
+    """
+
+    key = (package_name, flag_all)
+
+    # check if tree in the cache and still valid
+    if key in _module_tree_cache:
+        module_tree, time_list = _module_tree_cache[key]
+        if get_directory_times(module_tree) == time_list:
+            return module_tree
+
+    # discover tree
+    module_tree = discover_module_tree(package_name, flag_all)
+    _module_tree_cache[key] = (module_tree, get_directory_times(module_tree))
+
+    return module_tree
+
+
+def get_module_node(module_full_name, flag_all=False):
+    """
+    Gets the specification and the sub-packages/modules of a package/module,
+    in the trees kept in memory if one of them contains it (the trees are not
+    checked again), otherwise in the tree of the package/module itself (see
+    :func:`.get_module_tree`)
+
+    :param module_full_name: full name of the package/module
+    :type module_full_name: str
+    :param flag_all: see :func:`.get_sub_module_names`
+    :type flag_all: bool
+
+    :returns: see values of the output of :func:`.discover_module_tree`
+    :rtype: dict
+    """
+
+    # look for package/module in the trees kept in memory
+    for (_, flag_all_tree), (module_tree, _) in _module_tree_cache.items():
+        if flag_all_tree == flag_all and module_full_name in module_tree:
+            return module_tree[module_full_name]
+
+    return get_module_tree(module_full_name, flag_all)[module_full_name]
+
+
+def clear_module_tree_cache():
+    """
+    Clears the trees of packages kept in memory
+    """
+
+    _module_tree_cache.clear()
+
+
+def get_module_index(index_path=None):
+    """
+    Gets the index of modules saved in a file, it is loaded at the first call
+    and then shared in memory by all the tools
+
+    :param index_path: path to the JSON file of the index, ``None`` for an
+        index in memory only
+    :type index_path: str
+
+    :returns: index of modules
+    :rtype: ModuleIndex
+    """
+
+    if index_path is not None:
+        index_path = abspath(index_path)
+
+    if index_path not in _module_index_cache:
+        _module_index_cache[index_path] = ModuleIndex(index_path)
+
+    return _module_index_cache[index_path]
@@ -12,9 +12,16 @@ classes, based on
 https://autodocsumm.readthedocs.io/en/latest/examples.html?highlight=example_grouper#including-a-table-of-contents
 """
 
-import numpy as np
-from linecache import getline
-from importlib import import_module
+from io import BytesIO
+from hashlib import sha1
+from bisect import bisect_right
+from collections import OrderedDict
+from os import stat
+from os.path import abspath
+import tokenize
+import ast
+from tools_doc_sphinx.module_tree import get_module_tree, get_module_index, \
+    MODULE_INDEX_NAME
 
 
 # global variable
@@ -23,191 +30,591 @@ try:
 
 except Exception:
     #: (*str*) Name of the package to document with methods groups, imported
-    #: from a file named **pkg.py**
+    #: from a file named **pkg.py**, used if the configuration value
+    #: ``summary_groups_packages`` is empty (see :func:`.set_group_packages`)
     PACKAGE_NAME = ''
 
+#: (*int*) Maximum number of source code files in the cache of
+#: :func:`.group_parser`, the least recently used files are removed
+GROUP_CACHE_MAX_SIZE = 10000
+
+#: (*dict*) Indexes of methods groups already built, key is the package name,
+#: value is the output of :func:`.build_group_index`
+_group_index_cache = {}
+
+#: (*OrderedDict*) Methods groups of the source code files already parsed
+#: (least recently used first), key is the absolute path to the file, value
+#: is a list with the modification time in nanoseconds and the size of the
+#: file, the hash of its content and the output of :func:`.group_parser`
+_group_parser_cache = OrderedDict()
+
+#: (:class:`.module_tree.ModuleIndex`) Index of modules shared with
+#: :mod:`.auto_doc_api`, set at the beginning of a Sphinx build by
+#: :func:`.set_module_index`
+_module_index = None
+
+#: (*list*) Names of the packages documented with methods groups, set at the
+#: beginning of a Sphinx build by :func:`.set_group_packages`
+_package_list = []
+
+
+def get_group_markers(source):
+    """
+    Gets the comments starting and ending methods groups in a source code, in
+    a single pass of the tokenizer
+
+    A comment ``# Group: <name>`` starts a group and a comment ``# End group``
+    ends it, if the previous and the next lines are decoration comments
+    starting with ``# *********``, at any indentation (spaces or tabs).
+
+    :param source: content of the source code file
+    :type source: bytes
+
+    :returns: tuples ``(line, column, group_name)`` sorted by line,
+        ``group_name`` is ``None`` for the end of a group
+    :rtype: list
+    """
+
+    # define role identifiers
+    start_group_exp = "# Group: "
+    end_group_exp = "# End group"
+    deco_group = "# *********"
+
+    # get comments that are alone on their line, key is the line number,
+    # value is a tuple with the column and the comment
+    comment_dict = {}
+    for token in tokenize.tokenize(BytesIO(source).readline):
+        if token.type == tokenize.COMMENT \
+                and token.line.lstrip().startswith('#'):
+            comment_dict[token.start[0]] = (token.start[1], token.string)
+
+    # initialize output
+    marker_list = []
+
+    # loop on comments
+    for line, (column, comment) in sorted(comment_dict.items()):
+        # check if decorated comment
+        if not comment_dict.get(line - 1, (0, ''))[1].startswith(deco_group) \
+                or not comment_dict.get(line + 1, (0, ''))[1].startswith(
+                    deco_group
+                ):
+            continue
+
+        if comment.startswith(start_group_exp):
+            marker_list.append((line, column, comment[len(start_group_exp):]))
+
+        elif comment.startswith(end_group_exp):
+            marker_list.append((line, column, None))
+
+    return marker_list
+
+
+def get_first_line(node):
+    """
+    Gets the first line of a statement, including its decorators
+
+    :param node: statement
+    :type node: ast.stmt
+
+    :rtype: int
+    """
+
+    return min(
+        [node.lineno] + [
+            decorator.lineno
+            for decorator in getattr(node, "decorator_list", [])
+        ]
+    )
+
+
+def iter_statements(node_list):
+    """
+    Walks the statements of a syntax tree depth first (in the order of the
+    source code), without walking the expressions
+
+    :param node_list: statements, e.g. attribute ``body`` of the module
+    :type node_list: list
+
+    :returns: generator of statements
+    """
+
+    # initialize work queue (nodes are popped from its end)
+    stack = list(reversed(node_list))
+
+    while len(stack) > 0:
+        node = stack.pop()
+        if isinstance(node, ast.stmt):
+            yield node
+
+        # push blocks of compound statements (except handlers and match
+        # cases are walked for their body)
+        for field in ("body", "orelse", "finalbody", "handlers", "cases"):
+            child_list = getattr(node, field, None)
+            if isinstance(child_list, list):
+                stack.extend(reversed(child_list))
+
 
 def group_parser(module_path):
     """
     Gets the set of methods defined in a module along with their respective
-    group
+    group, see :func:`.parse_groups`
+
+    The output is kept in memory, the file is not read again as long as its
+    modification time and size are unchanged and it is not parsed again as
+    long as its content is unchanged. At most :data:`.GROUP_CACHE_MAX_SIZE`
+    files are kept in memory (the output must not be modified). Between
+    builds, the groups are kept in the index of modules, see
+    :func:`.launch_group_parser`.
 
     :param module_path: path to the source code file of the module
     :type module_path: str
 
+    :returns: see output of :func:`.parse_groups`
+    :rtype: dict
+    """
+
+    module_path = abspath(module_path)
+
+    # get modification time and size of the file
+    file_stat = stat(module_path)
+    stamp = [file_stat.st_mtime_ns, file_stat.st_size]
+
+    # check if file unchanged since it was parsed
+    entry = _group_parser_cache.get(module_path)
+    if entry is not None and entry[0] == stamp:
+        _group_parser_cache.move_to_end(module_path)
+        return entry[2]
+
+    with open(module_path, 'rb') as f:
+        source = f.read()
+
+    # check if content unchanged (e.g. file touched), parse it otherwise
+    source_hash = sha1(source).hexdigest()
+    if entry is not None and entry[1] == source_hash:
+        group_dict = entry[2]
+    else:
+        group_dict = parse_groups(source, module_path)
+
+    # store output in the cache
+    _group_parser_cache[module_path] = [stamp, source_hash, group_dict]
+    _group_parser_cache.move_to_end(module_path)
+
+    # remove least recently used files
+    while len(_group_parser_cache) > GROUP_CACHE_MAX_SIZE:
+        _group_parser_cache.popitem(last=False)
+
+    return group_dict
+
+
+def parse_groups(source, module_path="<unknown>"):
+    """
+    Gets the set of methods defined in a source code along with their
+    respective group
+
+    The source code is parsed only if it contains a group marker: the methods
+    are found with :mod:`ast` (including ``async`` and decorated methods,
+    methods of nested classes and multi-line signatures) and the groups are
+    found with :func:`.get_group_markers`. A method belongs to the group
+    started by the last marker before its first line (decorators included)
+    in the body of its class, markers are matched to a class by their
+    indentation.
+
+    :param source: content of the source code file
+    :type source: bytes
+    :param module_path: path to the source code file, for error messages
+    :type module_path: str
+
     :returns: structured as follows:
 
-        - Key is class name, value is a dictionary structured as follows:
+        - Key is class name (only classes with groups), value is a
+          dictionary structured as follows:
 
             - Key is group name, value is the list of methods contained in the
               group
     :rtype: dict
     """
 
-    # define role identifiers
-    start_group_exp = "    # Group: "
-    end_group_exp = "    # End group"
-    deco_group = "    # *********"
-    meth_exp = "    def "
-    class_exp = "class "
-
-    l_exp = max(len(start_group_exp), len(end_group_exp), len(deco_group),
-                len(meth_exp), len(class_exp))
-
-    # load file content
-    with open(module_path, 'r') as f:
-        trunc_array = np.array([line[:l_exp] for line in f.readlines()])
-
-    # get index of lines with class definition
-    class_inds = np.where(
-        np.array(
-            [trunc[:len(class_exp)] for trunc in trunc_array]
-        ) == class_exp
-    )[0]
-
-    # get list of classes name
-    class_name_list = []
-    for ind in class_inds:
-        class_name = getline(
-            module_path, ind + 1
-        )[len(class_exp):].split('(')[0]
-        class_name_list.append(class_name)
-
-    # get index of lines where the groups start and end
-    group_start_inds_tmp = np.where(
-        np.array(
-            [trunc[:len(start_group_exp)] for trunc in trunc_array]
-        ) == start_group_exp
-    )[0]
-
-    group_end_inds_tmp = np.where(trunc_array == end_group_exp)[0]
-
-    # initialize list of range of line indexes of groups
-    group_inds_list = []
-
-    # initialize list of groups name
-    group_name_list = []
-
-    # initialize dictionary with the methods included in each group
-    group_dict = {name: {} for name in class_name_list}
-
-    # initialize counters
-    i, j = 0, 0
-
-    # loop on groups indexes
-    while i < group_start_inds_tmp.shape[0] and j < group_end_inds_tmp.shape[0]:
-        # get group start and end indexes
-        start_ind = group_start_inds_tmp[i]
-        end_ind = group_end_inds_tmp[j]
-
-        # check if group start index is legit
-        start_ok = trunc_array[start_ind - 1] == deco_group and \
-            trunc_array[start_ind + 1] == deco_group
-
-        # check if group end index is legit
-        end_ok = trunc_array[end_ind - 1] == deco_group and \
-            trunc_array[end_ind + 1] == deco_group
-
-        # check if group is legit
-        if start_ok and end_ok:
-            # increment counters
-            i += 1
-            j += 1
-
-            # get class containing the group
-            class_ind = np.where(class_inds < start_ind)[0][-1]
-            class_name = class_name_list[class_ind]
-
-            # update group lists and dictionary
-            group_inds_list.append((start_ind, end_ind))
-            group_name = getline(
-                module_path, start_ind + 1
-            )[len(start_group_exp):-1]
-            group_name_list.append(group_name)
-            group_dict[class_name][group_name] = []
+    # initialize output
+    group_dict = {}
 
-        else:
-            # update counters
-            if not start_ok:
-                i += 1
-
-            if not end_ok:
-                j += 1
-
-    # get line indexes of the methods
-    meth_inds = np.where(
-        np.array(
-            [trunc[:len(meth_exp)] for trunc in trunc_array]
-        ) == meth_exp
-    )[0]
-
-    # loop on methods
-    for ind in meth_inds:
-        # get class containing the method
-        class_ind = np.where(class_inds < ind)[0][-1]
-        class_name = class_name_list[class_ind]
-
-        # get group containing the method and update group dictionary
-        for group_inds, group_name in zip(group_inds_list, group_name_list):
-            if ind >= group_inds[0] and ind <= group_inds[1]:
-                method_name = getline(
-                    module_path, ind + 1
-                )[len(meth_exp):].split('(')[0]
-                group_dict[class_name][group_name].append(method_name)
+    # check if there is no group
+    if b"# Group: " not in source:
+        return group_dict
+
+    # parse source code (a file that cannot be parsed has no group)
+    try:
+        node_list = list(iter_statements(ast.parse(source, module_path).body))
+        marker_list = get_group_markers(source)
+
+    except (SyntaxError, ValueError, tokenize.TokenError):
+        return group_dict
+
+    # get first line and column of all statements, sorted by line
+    stmt_list = sorted(
+        (get_first_line(node), node.col_offset) for node in node_list
+    )
+    line_list = [line for line, _ in stmt_list]
+
+    # loop on classes, in the order of the source code
+    for node in node_list:
+        if not isinstance(node, ast.ClassDef):
+            continue
+
+        # get end of class, i.e. first line of the next statement that is not
+        # indented deeper than the class
+        end_line = None
+        for line, column in stmt_list[bisect_right(line_list, node.lineno):]:
+            if column <= node.col_offset:
+                end_line = line
+                break
+
+        # get markers in the body of the class
+        body_column = node.body[0].col_offset
+        class_marker_list = [
+            (line, group_name) for line, column, group_name in marker_list
+            if line > node.lineno and (end_line is None or line < end_line)
+            and column == body_column
+        ]
+
+        # create groups
+        for _, group_name in class_marker_list:
+            if group_name is not None:
+                group_dict.setdefault(node.name, {})[group_name] = []
+
+        # loop on methods
+        for method_node in node.body:
+            if not isinstance(
+                method_node, (ast.FunctionDef, ast.AsyncFunctionDef)
+            ):
+                continue
+
+            # get last marker before the method
+            method_line = get_first_line(method_node)
+            group_name = None
+            for line, marker_group_name in class_marker_list:
+                if line > method_line:
+                    break
+
+                group_name = marker_group_name
+
+            if group_name is not None:
+                group_dict[node.name][group_name].append(method_node.name)
 
     return group_dict
 
 
-def launch_group_parser(package_name):
+def clear_group_cache():
+    """
+    Clears the cache of :func:`.group_parser`
     """
-    Recursive function for launching :func:`.group_parser` inside a package
+
+    _group_parser_cache.clear()
+
+
+def launch_group_parser(package_name, module_index=None):
+    """
+    Launches :func:`.group_parser` on all the source code files of a package
+    (modules and files ``__init__.py`` of the sub-packages), they are found
+    without importing the package with :func:`.module_tree.get_module_tree`,
+    so that the tree of the package is shared with :mod:`.auto_doc_api`
 
     :param package_name: name of the package
     :type package_name: str
+    :param module_index: index of modules shared with :mod:`.auto_doc_api`
+        (``None`` for no index), the groups of a module are read from the
+        index if its source code file is unchanged, otherwise they are stored
+        in the index, see :class:`.module_tree.ModuleIndex`
+    :type module_index: module_tree.ModuleIndex
 
     :returns: see output of :func:`.group_parser`
     """
 
-    # import package
-    package = import_module(package_name)
-
     # initialize output
     group_dict = {}
 
-    # check if package indeed
-    if hasattr(package, "__all__"):
-        # loop on modules and sub-packages
-        for member_name in package.__all__:
-            # recursive call
-            group_dict.update(
-                launch_group_parser("%s.%s" % (package_name, member_name))
+    # loop on packages/modules
+    for module_full_name, module_node in get_module_tree(package_name).items():
+        module_path = module_node["spec"].origin
+
+        # skip namespace packages and extension modules
+        if module_path is None or not module_path.endswith(".py"):
+            continue
+
+        # get groups of the module in the index
+        if module_index is not None:
+            group_dict_module = module_index.get_value(
+                module_full_name, module_path, "groups"
             )
 
-    # module imported
-    else:
-        # parse module and update global variable
-        group_dict.update(group_parser(package.__file__))
+        else:
+            group_dict_module = None
+
+        # parse source code file
+        if group_dict_module is None:
+            group_dict_module = group_parser(module_path)
+
+            if module_index is not None:
+                module_index.set_value(
+                    module_full_name, module_path, "groups", group_dict_module
+                )
+
+        group_dict.update(group_dict_module)
 
     return group_dict
 
 
+def build_group_index(package_name, module_index=None):
+    """
+    Builds the index of methods groups of a package, so that the group of a
+    method is retrieved with a single dictionary lookup
+
+    :param package_name: name of the package
+    :type package_name: str
+    :param module_index: see :func:`.launch_group_parser`
+    :type module_index: module_tree.ModuleIndex
+
+    :returns: key is a tuple ``(class_name, method_name)``, value is the name
+        of the group containing the method
+    :rtype: dict
+    """
+
+    # initialize output
+    group_index = {}
+
+    # loop on classes and groups
+    for class_name, group_dict_sub in launch_group_parser(
+        package_name, module_index
+    ).items():
+        for group_name, meth_list in group_dict_sub.items():
+            for method_name in meth_list:
+                group_index[(class_name, method_name)] = group_name
+
+    return group_index
+
+
+def get_group_index(package_name):
+    """
+    Gets the index of methods groups of a package, it is built with
+    :func:`.build_group_index` at the first call and then kept in memory until
+    :func:`.clear_group_index` is called
+
+    During a Sphinx build, the groups of the modules are read from (and
+    stored in) the index of modules set by :func:`.set_module_index`.
+
+    :param package_name: name of the package
+    :type package_name: str
+
+    :returns: see output of :func:`.build_group_index`
+    :rtype: dict
+    """
+
+    if package_name not in _group_index_cache:
+        _group_index_cache[package_name] = build_group_index(
+            package_name, _module_index
+        )
+
+        # save index of modules
+        if _module_index is not None:
+            _module_index.save()
+
+    return _group_index_cache[package_name]
+
+
+def set_module_index(app):
+    """
+    Sets the index of modules used by :func:`.get_group_index`, it is saved
+    in the file :data:`.module_tree.MODULE_INDEX_NAME` of the doctree
+    directory and shared with :mod:`.auto_doc_api`, so that the source code
+    files are parsed again only when they are modified
+
+    It is connected to the Sphinx event ``builder-inited``.
+
+    :param app: Sphinx application
+    """
+
+    global _module_index
+
+    _module_index = get_module_index(
+        "%s/%s" % (app.doctreedir, MODULE_INDEX_NAME)
+    )
+
+
+def clear_group_index(app, *args):
+    """
+    Clears the indexes of methods groups kept in memory, so that they are
+    built again at the next call of :func:`.get_group_index`
+
+    It is connected to the Sphinx event ``builder-inited``, so that the
+    indexes are built once per build (the source code files that are
+    unchanged are not parsed again, see :func:`.group_parser`).
+
+    :param app: Sphinx application
+    """
+
+    _group_index_cache.clear()
+
+
+def set_group_packages(app):
+    """
+    Sets the packages documented with methods groups and builds their index
+    of methods groups (see :func:`.get_group_index`), once at the beginning
+    of the build
+
+    The packages are given by the configuration value
+    ``summary_groups_packages`` (list of package names), or by
+    :data:`.PACKAGE_NAME` if it is empty. A package that cannot be found is
+    reported as a warning and ignored.
+
+    It is connected to the Sphinx event ``builder-inited``.
+
+    :param app: Sphinx application
+    """
+
+    global _package_list
+
+    # get packages to document
+    package_list = list(app.config.summary_groups_packages)
+    if len(package_list) == 0 and PACKAGE_NAME:
+        package_list = [PACKAGE_NAME]
+
+    # build indexes of methods groups
+    _package_list = []
+    for package_name in package_list:
+        try:
+            get_group_index(package_name)
+
+        except ImportError as error:
+            from sphinx.util import logging
+
+            logging.getLogger(__name__).warning(
+                "[summary_groups] %s ignored: %s" % (package_name, error)
+            )
+            continue
+
+        _package_list.append(package_name)
+
+
+def get_env_group_index(app, package_name):
+    """
+    Gets the index of methods groups of a package stored in the Sphinx
+    environment (attribute ``summary_groups_index``, key is the package name,
+    value is the output of :func:`.get_group_index`), it is stored at the
+    first call
+
+    The indexes are stored in the environment so that the ones built by the
+    Sphinx worker processes are merged in the main process, see
+    :func:`.merge_group_index`.
+
+    :param app: Sphinx application
+    :param package_name: name of the package
+    :type package_name: str
+
+    :returns: see output of :func:`.build_group_index`
+    :rtype: dict
+    """
+
+    group_index_dict = getattr(app.env, "summary_groups_index", None)
+    if group_index_dict is None:
+        group_index_dict = {}
+        app.env.summary_groups_index = group_index_dict
+
+    if package_name not in group_index_dict:
+        group_index_dict[package_name] = get_group_index(package_name)
+
+    return group_index_dict[package_name]
+
+
+def precompute_group_index(app, env, docnames):
+    """
+    Stores the indexes of methods groups of the documented packages (see
+    :func:`.set_group_packages`) in the Sphinx environment in the main
+    process, before the documents are read, so that the Sphinx worker
+    processes of a parallel build (``sphinx-build -j``) inherit them instead
+    of building them
+
+    It is connected to the Sphinx event ``env-before-read-docs``, the indexes
+    stored in the environment at the previous build are cleared.
+
+    :param app: Sphinx application
+    :param env: Sphinx environment
+    :param docnames: names of the documents to read
+    :type docnames: list
+    """
+
+    env.summary_groups_index = {}
+
+    for package_name in _package_list:
+        get_env_group_index(app, package_name)
+
+
+def merge_group_index(app, env, docnames, other):
+    """
+    Merges the indexes of methods groups built by a Sphinx worker process
+    (stored in its environment ``other``) in the environment of the main
+    process
+
+    It is connected to the Sphinx event ``env-merge-info``.
+
+    :param app: Sphinx application
+    :param env: Sphinx environment of the main process
+    :param docnames: names of the documents read by the worker process
+    :type docnames: set
+    :param other: Sphinx environment of the worker process
+    """
+
+    group_index_dict = getattr(env, "summary_groups_index", None)
+    if group_index_dict is None:
+        group_index_dict = {}
+        env.summary_groups_index = group_index_dict
+
+    for package_name, group_index in getattr(
+        other, "summary_groups_index", {}
+    ).items():
+        group_index_dict.setdefault(package_name, group_index)
+
+
 def example_grouper(app, what, name, obj, section, parent):
     """
     See
     https://autodocsumm.readthedocs.io/en/latest/examples.html?highlight=example_grouper#including-a-table-of-contents
     """
 
-    group_dict = launch_group_parser(PACKAGE_NAME)
-    for class_name, group_dict_sub in group_dict.items():
-        for group_name, meth_list in group_dict_sub.items():
-            if name in meth_list and class_name == parent.__name__:
-                return group_name
+    key = (getattr(parent, "__name__", None), name)
+
+    # look for method in the indexes of the documented packages
+    for package_name in _package_list:
+        group_name = get_env_group_index(app, package_name).get(key)
+        if group_name is not None:
+            return group_name
+
+    return None
 
 
 def setup(app):
     """
     See
     https://autodocsumm.readthedocs.io/en/latest/examples.html?highlight=example_grouper#including-a-table-of-contents
+
+    The packages are given by the configuration value
+    ``summary_groups_packages`` in **conf.py**, see
+    :func:`.set_group_packages`.
+
+    The extension is safe for parallel builds (``sphinx-build -j``): the
+    index of methods groups is built in the main process before the
+    documents are read (see :func:`.precompute_group_index`) and the indexes
+    of the worker processes are merged (see :func:`.merge_group_index`).
+
+    :returns: extension metadata
+    :rtype: dict
     """
-    
+
+    app.add_config_value("summary_groups_packages", [], "env")
+
+    app.connect('builder-inited', set_module_index)
+    app.connect('builder-inited', clear_group_index)
+    app.connect('builder-inited', set_group_packages)
+    app.connect('env-before-read-docs', precompute_group_index)
+    app.connect('env-merge-info', merge_group_index)
     app.connect('autodocsumm-grouper', example_grouper)
+
+    return {"parallel_read_safe": True, "parallel_write_safe": True}
@@ -8,13 +8,14 @@
 
 """
 Script for extracting the tree view of source code, it automatically handles
-the gitignore file at the root directory
+the gitignore files of the directories
 """
 
-from os.path import isfile, isdir, basename, abspath
-from os import listdir, remove
+from os.path import isfile, basename, abspath
+from os import scandir
 from argparse import ArgumentParser
 from glob import glob
+import re
 
 
 def get_ignored_items(dir_root, ignore_list):
@@ -53,24 +54,384 @@ def get_ignored_items(dir_root, ignore_list):
     return ignored_item_list
 
 
-def write_tree_view_recursive(
-    dir_root_path, output_path, dir_root_name=None, ignored_item_list=[],
-    level=0
+def translate_ignore_pattern(pattern):
+    """
+    Translates a gitignore pattern into a regular expression, see
+    https://git-scm.com/docs/gitignore#_pattern_format
+
+    The regular expression is meant to be matched against the path of an item
+    relative to the directory of the gitignore file, with ``/`` as separator.
+    A pattern with a separator at the beginning or in the middle is anchored
+    to this directory, otherwise it matches at any level below it.
+
+    :param pattern: gitignore pattern, without negation prefix ``!`` and
+        without trailing ``/``
+    :type pattern: str
+
+    :returns: regular expression
+    :rtype: str
+    """
+
+    # check if pattern is anchored to the directory of the gitignore file
+    if '/' in pattern:
+        pattern = pattern.lstrip('/')
+
+    else:
+        pattern = "**/" + pattern
+
+    # initialize regular expression
+    regex = ''
+
+    # loop on characters of the pattern
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        flag_segment_start = i == 0 or pattern[i - 1] == '/'
+
+        if flag_segment_start and pattern.startswith("**/", i):
+            # zero or more directories
+            regex += "(?:.*/)?"
+            i += 3
+
+        elif flag_segment_start and pattern[i:] == "**":
+            # everything inside
+            regex += ".*"
+            i += 2
+
+        elif char == '*':
+            regex += "[^/]*"
+            i += 1
+
+        elif char == '?':
+            regex += "[^/]"
+            i += 1
+
+        elif char == '[' and ']' in pattern[i + 2:]:
+            # bracket expression
+            end = pattern.index(']', i + 2)
+            content = pattern[i + 1:end]
+            if content[0] == '!':
+                content = '^' + content[1:]
+
+            regex += "[%s]" % content.replace('\\', '\\\\')
+            i = end + 1
+
+        elif char == '\\' and i + 1 < len(pattern):
+            # escaped character
+            regex += re.escape(pattern[i + 1])
+            i += 2
+
+        else:
+            regex += re.escape(char)
+            i += 1
+
+    return "^%s$" % regex
+
+
+def compile_ignore_list(ignore_list):
+    """
+    Compiles gitignore patterns
+
+    :param ignore_list: gitignore patterns, blank lines and comments are
+        skipped
+    :type ignore_list: list
+
+    :returns: compiled patterns (in the same order), each element is a tuple
+        with 3 elements:
+
+        - (:class:`re.Pattern`) regular expression, see
+          :func:`.translate_ignore_pattern`,
+        - (*bool*) specify if negation pattern (prefix ``!``),
+        - (*bool*) specify if the pattern only matches directories (trailing
+          ``/``).
+    :rtype: list
+    """
+
+    # initialize output
+    rule_list = []
+
+    # loop on patterns
+    for pattern in ignore_list:
+        # remove trailing spaces (unless escaped) and end of line
+        pattern = pattern.rstrip('\r\n')
+        if not pattern.endswith("\\ "):
+            pattern = pattern.rstrip(' ')
+
+        # skip blank lines and comments
+        if pattern == '' or pattern[0] == '#':
+            continue
+
+        # check if negation
+        flag_negation = pattern[0] == '!'
+        if flag_negation:
+            pattern = pattern[1:]
+
+        # check if only directories
+        flag_dir_only = pattern.endswith('/')
+        if flag_dir_only:
+            pattern = pattern.rstrip('/')
+
+        if pattern == '':
+            continue
+
+        rule_list.append((
+            re.compile(translate_ignore_pattern(pattern)), flag_negation,
+            flag_dir_only
+        ))
+
+    return rule_list
+
+
+def load_gitignore(gitignore_path):
+    """
+    Loads the patterns of a gitignore file
+
+    :param gitignore_path: path to the gitignore file
+    :type gitignore_path: str
+
+    :returns: patterns (lines of the file)
+    :rtype: list
+    """
+
+    with open(gitignore_path, 'r') as f:
+        return f.read().splitlines()
+
+
+def is_ignored(item_path, flag_dir, ignore_rule_list):
+    """
+    Checks if an item must be ignored in the tree view
+
+    As in git, the last pattern that matches the item decides if it is
+    ignored, and the patterns of a gitignore file in a sub-directory come
+    after the ones of its parent directories. The parent directories of the
+    item are supposed not to be ignored (ignored directories are not walked).
+
+    :param item_path: path to the item
+    :type item_path: str
+    :param flag_dir: specify if the item is a directory
+    :type flag_dir: bool
+    :param ignore_rule_list: each element is a tuple with 2 elements: path to
+        the directory where the patterns apply (same root as ``item_path``)
+        and compiled patterns (see output of :func:`.compile_ignore_list`)
+    :type ignore_rule_list: list
+
+    :rtype: bool
+    """
+
+    # initialize output
+    flag_ignored = False
+
+    # loop on directories with patterns
+    for base_dir, rule_list in ignore_rule_list:
+        # check if item is inside the directory
+        if not item_path.startswith(base_dir + '/'):
+            continue
+
+        # get item path relative to the directory
+        item_path_relative = item_path[len(base_dir) + 1:]
+
+        # loop on patterns
+        for regex, flag_negation, flag_dir_only in rule_list:
+            if flag_negation == flag_ignored \
+                    and (flag_dir or not flag_dir_only) \
+                    and regex.match(item_path_relative):
+                flag_ignored = not flag_negation
+
+    return flag_ignored
+
+
+def list_tree_items(
+    dir_path, ignore_rule_list, ignored_item_set=frozenset(),
+    flag_gitignore=True, max_entries_per_dir=None, flag_dir_summary=False
+):
+    """
+    Lists the items of a directory that are not ignored in the tree view
+
+    The directory is read in a single pass of :func:`os.scandir` (closed
+    before returning), only the displayed items are kept and the other ones
+    are counted, so that the memory needed for a directory is bounded by
+    ``max_entries_per_dir`` whatever its number of items.
+
+    :param dir_path: path to the directory
+    :type dir_path: str
+    :param ignore_rule_list: compiled gitignore patterns of the directories
+        above ``dir_path``, see :func:`.is_ignored`
+    :type ignore_rule_list: list
+    :param ignored_item_set: paths to other items to ignore, see
+        :func:`.get_ignored_items`
+    :type ignored_item_set: set
+    :param flag_gitignore: specify if the gitignore file of the directory is
+        taken into account
+    :type flag_gitignore: bool
+    :param max_entries_per_dir: maximum number of items displayed, ``None``
+        for no limit
+    :type max_entries_per_dir: int
+    :param flag_dir_summary: specify if the files of the directory are
+        summarized, see :func:`.get_directory_summary`
+    :type flag_dir_summary: bool
+
+    :returns:
+        - **item_list** (*list*) -- displayed items, each element is a tuple
+          with the :class:`os.DirEntry` and a boolean specifying if it is a
+          directory (directories first and then files)
+        - **nb_more** (*int*) -- number of items that are not displayed
+        - **summary** (*str*) -- annotation of the directory, empty if
+          ``flag_dir_summary`` is ``False``
+        - **ignore_rule_list** (*list*) -- gitignore patterns that apply to
+          the content of the directory (with the ones of its gitignore file)
+    """
+
+    # check if gitignore file in directory
+    gitignore_path = "%s/.gitignore" % dir_path
+    if flag_gitignore and isfile(gitignore_path):
+        ignore_rule_list = ignore_rule_list + [(
+            dir_path, compile_ignore_list(load_gitignore(gitignore_path))
+        )]
+
+    # initialize displayed items (at most max_entries_per_dir of each type,
+    # so that directories come first) and counters
+    dir_list = []
+    file_list = []
+    nb_dir = 0
+    nb_file = 0
+    nb_byte = 0
+
+    # loop on items
+    with scandir(dir_path) as entry_iterator:
+        for entry in entry_iterator:
+            flag_dir = entry.is_dir()
+            if not flag_dir and not entry.is_file():
+                continue
+
+            item_path = "%s/%s" % (dir_path, entry.name)
+            if item_path in ignored_item_set \
+                    or is_ignored(item_path, flag_dir, ignore_rule_list):
+                continue
+
+            if flag_dir:
+                nb_dir += 1
+                if max_entries_per_dir is None \
+                        or len(dir_list) < max_entries_per_dir:
+                    dir_list.append((entry, True))
+
+            else:
+                nb_file += 1
+                if flag_dir_summary:
+                    try:
+                        nb_byte += entry.stat().st_size
+
+                    except OSError:
+                        pass
+
+                if max_entries_per_dir is None \
+                        or len(file_list) < max_entries_per_dir:
+                    file_list.append((entry, False))
+
+    item_list = dir_list + file_list
+    if max_entries_per_dir is not None:
+        item_list = item_list[:max_entries_per_dir]
+
+    if flag_dir_summary:
+        summary = get_directory_summary(nb_file, nb_byte)
+    else:
+        summary = ''
+
+    return item_list, nb_dir + nb_file - len(item_list), summary, \
+        ignore_rule_list
+
+
+def format_size(nb_byte):
+    """
+    Formats a size in bytes with a decimal unit (B, kB, MB, GB, TB)
+
+    :param nb_byte: size in bytes
+    :type nb_byte: int
+
+    :rtype: str
+    """
+
+    if nb_byte < 1000:
+        return "%d B" % nb_byte
+
+    size = float(nb_byte)
+    for unit in ["kB", "MB", "GB", "TB"]:
+        size /= 1000
+        if size < 1000 or unit == "TB":
+            return "%.1f %s" % (size, unit)
+
+
+def get_directory_summary(nb_file, nb_byte):
+    """
+    Gets the annotation of a directory in the tree view, with the number and
+    the total size of the files directly inside it (not in its
+    sub-directories)
+
+    :param nb_file: number of files directly inside the directory
+    :type nb_file: int
+    :param nb_byte: total size of these files in bytes
+    :type nb_byte: int
+
+    :returns: annotation, e.g. ``" (3 files, 12.5 kB)"``
+    :rtype: str
+    """
+
+    return " (%d file%s, %s)" % (
+        nb_file, 's' if nb_file != 1 else '', format_size(nb_byte)
+    )
+
+
+def iter_tree_view(
+    dir_root_path, dir_root_name=None, ignored_item_list=[], level=0,
+    ignore_rule_list=None, flag_nested_gitignore=True, max_depth=None,
+    max_entries_per_dir=None, flag_dir_summary=False
 ):
     """
-    Recursive function for writing tree view in a TXT file
+    Generator of the lines of the tree view
+
+    The directories are walked iteratively (depth first) with an explicit
+    stack, so that the depth of the tree is not limited by the recursion limit
+    and lines are yielded as soon as they are found. Each directory is
+    listed once (see :func:`.list_tree_items`) and its handle is closed before
+    its sub-directories are walked, so that a single directory is open at a
+    time whatever the depth. The displayed items of the directories being
+    walked are kept on the stack, so that the memory grows with the depth of
+    the tree times ``max_entries_per_dir``, which is the only bound on the
+    width (without it, the memory grows with the number of items of the
+    directories being walked).
 
     :param dir_root_path: path to the root directory for the tree view
     :type dir_root_path: str
-    :param output_path: path to output file where to write the tree view
-    :type output_path: str
     :param dir_root_name: name to use as root directory inside the tree view,
         by default it is the basename of ``dir_root_path``
     :type dir_root_name: str
-    :param ignored_item_list: items to ignore in the tree view
+    :param ignored_item_list: paths to the items to ignore in the tree view,
+        see :func:`.get_ignored_items` (deprecated, use ``ignore_rule_list``
+        instead)
     :type ignored_item_list: list
-    :param level: nesting level inside the package structure
+    :param level: nesting level of ``dir_root_path`` inside the tree view
     :type level: int
+    :param ignore_rule_list: compiled gitignore patterns of the directories
+        above ``dir_root_path``, see :func:`.is_ignored`, they are evaluated
+        for each item while walking, so that ignored directories are not
+        walked
+    :type ignore_rule_list: list
+    :param flag_nested_gitignore: specify if the gitignore files in the
+        sub-directories of ``dir_root_path`` are taken into account
+    :type flag_nested_gitignore: bool
+    :param max_depth: maximum number of levels of the tree view below
+        ``dir_root_path`` (at least 1), the directories of the last level are
+        not walked, ``None`` for no limit
+    :type max_depth: int
+    :param max_entries_per_dir: maximum number of items displayed for a
+        directory, the other ones are summarized in a line ``... N more``,
+        ``None`` for no limit
+    :type max_entries_per_dir: int
+    :param flag_dir_summary: specify if the lines of the directories are
+        annotated with the number and the total size of the files directly
+        inside them, see :func:`.get_directory_summary`
+    :type flag_dir_summary: bool
+
+    :returns: generator of lines (with end of line)
     """
 
     if dir_root_name is None:
@@ -79,30 +440,128 @@ def write_tree_view_recursive(
     if dir_root_name != '':
         dir_root_name += '/'
 
-    listing = listdir(dir_root_path)
-    listing_dir = [i for i in listing if isdir("%s/%s" % (dir_root_path, i))]
-    listing_file = [i for i in listing if isfile("%s/%s" % (dir_root_path, i))]
-    listing = listing_dir + listing_file
-
-    for item in listing:
-        item_path = "%s/%s" % (dir_root_path, item)
-        item_path_relative = "%s%s" % (dir_root_name, item)
-        if item_path not in ignored_item_list:
-            if item in listing_dir:
-                with open(output_path, 'a') as f:
-                    f.write(' ' * 4 * level)
-                    f.write("|__ %s%s\n" % (dir_root_name, item))
-
-                write_tree_view_recursive(
-                    item_path, output_path,
-                    dir_root_name=item_path_relative,
-                    ignored_item_list=ignored_item_list, level=level + 1
-                )
+    if ignore_rule_list is None:
+        ignore_rule_list = []
 
-            else:
-                with open(output_path, 'a') as f:
-                    f.write(' ' * 4 * level)
-                    f.write("|__ %s\n" % item)
+    ignored_item_set = set(ignored_item_list)
+
+    # get deepest level of walked directories
+    if max_depth is None:
+        max_level = None
+    else:
+        max_level = level + max_depth - 1
+
+    # initialize stack of directories being walked, each element is a tuple
+    # with the path to the directory, an iterator on its displayed items, the
+    # number of items that are not displayed, its name inside the tree view,
+    # its nesting level and the gitignore patterns
+    item_list, nb_more, _, _ = list_tree_items(
+        dir_root_path, ignore_rule_list, ignored_item_set,
+        flag_gitignore=False, max_entries_per_dir=max_entries_per_dir
+    )
+    stack = [(
+        dir_root_path, iter(item_list), nb_more, dir_root_name, level,
+        ignore_rule_list
+    )]
+
+    while len(stack) > 0:
+        dir_path, item_iterator, nb_more, dir_name, level, rule_list = \
+            stack[-1]
+
+        # get next item in the directory
+        item = next(item_iterator, None)
+
+        # check if directory is over
+        if item is None:
+            if nb_more > 0:
+                yield "%s|__ ... %d more\n" % (' ' * 4 * level, nb_more)
+
+            stack.pop()
+            continue
+
+        entry, flag_dir = item
+        item_path = "%s/%s" % (dir_path, entry.name)
+
+        if flag_dir:
+            flag_walk = max_level is None or level < max_level
+
+            # list sub-directory (if walked or annotated, no item is kept if
+            # it is only annotated)
+            summary = ''
+            if flag_walk or flag_dir_summary:
+                sub_item_list, sub_nb_more, summary, sub_rule_list = \
+                    list_tree_items(
+                        item_path, rule_list, ignored_item_set,
+                        flag_gitignore=flag_nested_gitignore,
+                        max_entries_per_dir=(
+                            max_entries_per_dir if flag_walk else 0
+                        ),
+                        flag_dir_summary=flag_dir_summary
+                    )
+
+            yield "%s|__ %s%s%s\n" % (
+                ' ' * 4 * level, dir_name, entry.name, summary
+            )
+
+            # walk sub-directory
+            if flag_walk:
+                stack.append((
+                    item_path, iter(sub_item_list), sub_nb_more,
+                    "%s%s/" % (dir_name, entry.name), level + 1, sub_rule_list
+                ))
+
+        else:
+            yield "%s|__ %s\n" % (' ' * 4 * level, entry.name)
+
+
+def write_tree_view(dir_root_path, output_path, file_option='a', **kwargs):
+    """
+    Writes tree view in a TXT file, the lines given by :func:`.iter_tree_view`
+    are written through a single buffered file handle
+
+    :param dir_root_path: path to the root directory for the tree view
+    :type dir_root_path: str
+    :param output_path: path to output file where to write the tree view
+    :type output_path: str
+    :param file_option: mode when opening the output file
+    :type file_option: str
+    :param kwargs: keyword arguments of :func:`.iter_tree_view`
+    """
+
+    with open(output_path, file_option) as f:
+        f.writelines(iter_tree_view(dir_root_path, **kwargs))
+
+
+def write_tree_view_recursive(
+    dir_root_path, output_path, dir_root_name=None, ignored_item_list=[],
+    level=0, ignore_rule_list=None, flag_nested_gitignore=True
+):
+    """
+    Writes tree view in a TXT file, kept for compatibility, see
+    :func:`.write_tree_view` (the walk is no longer recursive)
+
+    :param dir_root_path: path to the root directory for the tree view
+    :type dir_root_path: str
+    :param output_path: path to output file where to write the tree view
+    :type output_path: str
+    :param dir_root_name: see :func:`.iter_tree_view`
+    :type dir_root_name: str
+    :param ignored_item_list: see :func:`.iter_tree_view`
+    :type ignored_item_list: list
+    :param level: see :func:`.iter_tree_view`
+    :type level: int
+    :param ignore_rule_list: see :func:`.iter_tree_view`
+    :type ignore_rule_list: list
+    :param flag_nested_gitignore: see :func:`.iter_tree_view`
+    :type flag_nested_gitignore: bool
+    """
+
+    write_tree_view(
+        dir_root_path, output_path, dir_root_name=dir_root_name,
+        ignored_item_list=ignored_item_list, level=level,
+        ignore_rule_list=ignore_rule_list,
+        flag_nested_gitignore=flag_nested_gitignore
+    )
 
 
 if __name__ == '__main__':
@@ -135,6 +594,28 @@ if __name__ == '__main__':
         default="tree_view.txt"
     )
 
+    parser.add_argument(
+        "--max_depth",
+        type=int,
+        help="maximum number of levels of the tree view, default None",
+        default=None
+    )
+
+    parser.add_argument(
+        "--max_entries_per_dir",
+        type=int,
+        help="maximum number of items displayed for a directory, the other "
+        "ones are summarized in a line '... N more', default None",
+        default=None
+    )
+
+    parser.add_argument(
+        "--flag_dir_summary",
+        action="store_true",
+        help="specify if the directories are annotated with the number and "
+        "the total size of the files directly inside them"
+    )
+
     args, _ = parser.parse_known_args()
     dir_root = abspath(args.dir_root)
     ignore_list = args.ignore_list
@@ -147,25 +628,19 @@ if __name__ == '__main__':
     # check if gitignore file in root directory
     gitignore_path = "%s/.gitignore" % dir_root
     if isfile(gitignore_path):
-        # load gitignore
-        with open(gitignore_path, 'r') as f:
-            gitignore_list = [
-                s.replace('\n', '') for s in f.readlines()
-                if s != '\n' and s[0] != '#'
-            ]
-
-        # fuse with input ignore list
-        ignore_list = list(set(ignore_list + gitignore_list))
+        # load gitignore and fuse with input ignore list (input patterns come
+        # last so that they have precedence)
+        ignore_list = load_gitignore(gitignore_path) + ignore_list
 
         # add git folder to ignore list
         ignore_list += [".git"]
 
-    ignored_item_list = get_ignored_items(dir_root, ignore_list)
-
-    if isfile(output_path):
-        remove(output_path)
+    # compile patterns
+    ignore_rule_list = [(dir_root, compile_ignore_list(ignore_list))]
 
-    write_tree_view_recursive(
-        dir_root, output_path, dir_root_name='',
-        ignored_item_list=ignored_item_list
+    write_tree_view(
+        dir_root, output_path, file_option='w', dir_root_name='',
+        ignore_rule_list=ignore_rule_list, max_depth=args.max_depth,
+        max_entries_per_dir=args.max_entries_per_dir,
+        flag_dir_summary=args.flag_dir_summary
     )